@@ -0,0 +1,522 @@
+"""
+Synthetic Corpus Generator
+Generates course documents at scale and bulk-loads them into a scratch
+database and vector store to measure indexing time, index size and query latency
+
+Usage (from the Minor directory):
+    python -m benchmarks.corpus_generator generate --output ../data/synthetic --documents 10000 --pages 5-60
+    python -m benchmarks.corpus_generator load --corpus ../data/synthetic --output load.json
+
+Documents are PDFs (or form-feed separated text files, see --pdf-share) with a
+title, section headings, Zipf-distributed prose around per-course topic words,
+and running headers and page-number footers. --duplicate-rate adds byte
+identical re-uploads and --near-duplicate-rate adds revisions with a few
+pages rewritten. A manifest.json records every file and a set of queries
+sampled from the text, each with the file it came from.
+
+`load` runs the corpus through the real IngestionQueue and DocumentProcessor
+against a scratch SQLite database, page cache and Chroma directory. With
+--hashed-embeddings chunks are embedded with a fast feature-hashing model
+instead of the sentence-transformers model, so index size and query latency
+can be measured at millions of chunks without the model cost (this needs
+CHUNKING_STRATEGY=characters, as the hashing model has no tokenizer).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+
+CONSONANTS = "bcdfghjklmnprstvz"
+VOWELS = "aeiou"
+COURSE_KINDS = ["Foundations", "Methods", "Systems", "Analysis", "Theory", "Applications"]
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+FONT_SIZE, LEADING, MARGIN = 10, 12, 50
+LINE_CHARACTERS = 95
+
+
+class Vocabulary:
+    """Pseudo-words sampled with a Zipf distribution, plus topic words per course"""
+
+    def __init__(self, size: int, rng: random.Random, zipf_exponent: float = 1.1):
+        words = set()
+        while len(words) < size:
+            syllables = rng.choice((1, 2, 2, 3, 3, 4))
+            words.add("".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)))
+        self.words = sorted(words, key=len)  # Short words are the frequent ones, as in real text
+        self.cum_weights = list(_cumulative(1 / (rank ** zipf_exponent) for rank in range(1, size + 1)))
+
+    def sample(self, rng: random.Random, count: int) -> List[str]:
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+
+    def topics(self, rng: random.Random, count: int) -> List[str]:
+        """Mid-frequency words that characterise one course"""
+        middle = self.words[len(self.words) // 10:len(self.words) // 2]
+        return rng.sample(middle, min(count, len(middle)))
+
+
+class CorpusGenerator:
+    """
+    Writes a reproducible corpus of course documents. Every document is built
+    from its own seed, so near-duplicates regenerate their source instead of
+    keeping it in memory and arbitrarily large corpora stream to disk.
+    """
+
+    def __init__(self, documents: int = 100, pages: Tuple[int, int] = (5, 40), words_per_page: int = 350,
+                 vocabulary_size: int = 20000, courses: int = 20, uploaders: int = 10,
+                 duplicate_rate: float = 0.05, near_duplicate_rate: float = 0.05,
+                 pdf_share: float = 1.0, queries: int = 200, seed: int = 0):
+        self.documents = documents
+        self.pages = pages
+        self.words_per_page = words_per_page
+        self.uploaders = uploaders
+        self.duplicate_rate = duplicate_rate
+        self.near_duplicate_rate = near_duplicate_rate
+        self.pdf_share = pdf_share
+        self.queries = queries
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self.vocabulary = Vocabulary(vocabulary_size, rng)
+        self.courses = []
+        for index in range(courses):
+            topics = self.vocabulary.topics(rng, 40)
+            self.courses.append({
+                "name": f"{topics[0].capitalize()} {COURSE_KINDS[index % len(COURSE_KINDS)]} {index + 1}",
+                "topics": topics
+            })
+
+    def generate(self, output_dir: str) -> Dict:
+        """Write the documents and manifest.json, returns the manifest"""
+        os.makedirs(output_dir, exist_ok=True)
+        rng = random.Random(self.seed + 1)
+        originals: List[Dict] = []
+        entries: List[Dict] = []
+        query_every = max(1, self.documents // max(self.queries, 1))
+        queries = []
+
+        for index in range(self.documents):
+            roll = rng.random()
+            if originals and roll < self.duplicate_rate:
+                source = rng.choice(originals)
+                entry = {**source, "kind": "duplicate", "source": source["file"]}
+                entry["file"] = f"doc{index:06d}_copy{os.path.splitext(source['file'])[1]}"
+                shutil.copyfile(os.path.join(output_dir, source["file"]), os.path.join(output_dir, entry["file"]))
+            elif originals and roll < self.duplicate_rate + self.near_duplicate_rate:
+                source = rng.choice(originals)
+                pages = self._document_pages(source)
+                for page_number in rng.sample(range(len(pages)), max(1, len(pages) // 10)):
+                    pages[page_number] = self._page(random.Random(f"{self.seed}:{index}:{page_number}"),
+                                                    self.courses[source["course_index"]], source["title"],
+                                                    page_number, len(pages))
+                entry = {**source, "kind": "near_duplicate", "source": source["file"]}
+                entry["file"] = f"doc{index:06d}_rev{os.path.splitext(source['file'])[1]}"
+                self._write(os.path.join(output_dir, entry["file"]), pages)
+            else:
+                entry = self._new_document(index, rng)
+                pages = self._document_pages(entry)
+                self._write(os.path.join(output_dir, entry["file"]), pages)
+                originals.append(entry)
+                if index % query_every == 0 and len(queries) < self.queries:
+                    queries.append({"query": self._query(rng, pages), "file": entry["file"]})
+            entries.append(entry)
+
+        manifest = {
+            "generated_at": datetime.now().isoformat(),
+            "config": {
+                "documents": self.documents, "pages": list(self.pages), "words_per_page": self.words_per_page,
+                "vocabulary_size": len(self.vocabulary.words), "courses": len(self.courses),
+                "uploaders": self.uploaders, "duplicate_rate": self.duplicate_rate,
+                "near_duplicate_rate": self.near_duplicate_rate, "pdf_share": self.pdf_share, "seed": self.seed
+            },
+            "documents": entries,
+            "queries": queries
+        }
+        with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=1)
+        return manifest
+
+    def _new_document(self, index: int, rng: random.Random) -> Dict:
+        course_index = rng.randrange(len(self.courses))
+        topics = self.courses[course_index]["topics"]
+        extension = ".pdf" if rng.random() < self.pdf_share else ".txt"
+        return {
+            "file": f"doc{index:06d}{extension}",
+            "kind": "original",
+            "source": None,
+            "seed": rng.randrange(2 ** 31),
+            "course_index": course_index,
+            "course": self.courses[course_index]["name"],
+            "uploader": f"faculty{rng.randrange(self.uploaders):03d}",
+            "title": " ".join(word.capitalize() for word in rng.sample(topics, 3)),
+            "pages": rng.randint(*self.pages)
+        }
+
+    def _document_pages(self, entry: Dict) -> List[str]:
+        rng = random.Random(entry["seed"])
+        course = self.courses[entry["course_index"]]
+        return [self._page(rng, course, entry["title"], page_number, entry["pages"])
+                for page_number in range(entry["pages"])]
+
+    def _page(self, rng: random.Random, course: Dict, title: str, page_number: int, page_count: int) -> str:
+        """One page: running header, optional heading, wrapped paragraphs, page-number footer"""
+        lines = [f"{course['name']} - {title}", ""]
+        if page_number == 0:
+            lines += [title.upper(), f"Lecture notes for {course['name']}", ""]
+        elif rng.random() < 0.3:
+            lines += [f"{page_number}. {' '.join(w.capitalize() for w in rng.sample(course['topics'], 2))}", ""]
+
+        words_left = self.words_per_page
+        while words_left > 0:
+            length = min(words_left, rng.randint(40, 120))
+            paragraph = " ".join(self._sentence(rng, course) for _ in range(max(1, length // 15)))
+            lines += _wrap(paragraph, LINE_CHARACTERS) + [""]
+            words_left -= length
+        lines.append(f"Page {page_number + 1} of {page_count}")
+        return "\n".join(lines)
+
+    def _sentence(self, rng: random.Random, course: Dict) -> str:
+        words = self.vocabulary.sample(rng, rng.randint(8, 22))
+        for position in range(len(words)):
+            if rng.random() < 0.12:
+                words[position] = rng.choice(course["topics"])
+        return " ".join(words).capitalize() + "."
+
+    def _query(self, rng: random.Random, pages: List[str]) -> str:
+        """A sentence from the body of a random page"""
+        body = " ".join(pages[rng.randrange(len(pages))].splitlines()[2:-1])
+        sentences = [s.strip() for s in body.split(".") if len(s.split()) >= 8]
+        return (rng.choice(sentences) + ".") if sentences else body[:200]
+
+    def _write(self, path: str, pages: List[str]):
+        if path.endswith(".pdf"):
+            write_pdf(path, pages)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\f".join(pages))
+
+
+def write_pdf(path: str, pages: List[str]):
+    """Minimal PDF with one Helvetica text block per page, no dependencies"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_refs = []
+    for page in pages:
+        lines = page.splitlines()
+        # Long pages are set smaller rather than cut off
+        leading = min(LEADING, (PAGE_HEIGHT - 2 * MARGIN) / max(len(lines), 1))
+        font_size = round(FONT_SIZE * leading / LEADING, 2)
+        text = "".join(f"({_pdf_escape(line)}) '\n" for line in lines)
+        stream = (f"BT /F1 {font_size} Tf {leading:.2f} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td\n{text}ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        ).encode("latin-1"))
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+class HashedEmbeddings(Embeddings):
+    """
+    Feature-hashing bag of words: each word adds +-1 to one of `dimensions`
+    buckets, the vector is L2 normalized. Deterministic across processes and
+    orders of magnitude faster than the real model, with enough lexical
+    signal for retrieval hit rates to be meaningful.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in text.lower().split():
+            code = zlib.crc32(word.strip(".,;:").encode("utf-8"))
+            vector[code % self.dimensions] += 1.0 if code & 0x80000000 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+def bulk_load(corpus: str, scratch_dir: str, hashed_embeddings: bool = False, workers: Optional[int] = None,
+              upload_size: int = 50, limit: Optional[int] = None) -> Dict:
+    """
+    Ingest a generated corpus through IngestionQueue into a scratch database,
+    page cache and vector store. Each uploader's documents are registered in
+    batches of `upload_size`, like ZIP uploads from the Faculty Portal.
+    """
+    import services.embedding_service as embedding_service
+    from config import CHUNKING_STRATEGY, INGESTION_WORKERS
+    from services.database import Database
+    from services.document_processor import DocumentProcessor
+    from services.embedding_cache import CachedEmbeddings
+    from services.ingestion_queue import IngestionQueue
+    from services.page_cache import PageCache
+    from benchmarks.ingestion_benchmark import PeakMemorySampler
+
+    with open(os.path.join(corpus, "manifest.json")) as f:
+        manifest = json.load(f)
+    entries = manifest["documents"][:limit]
+
+    if hashed_embeddings:
+        if CHUNKING_STRATEGY == "tokens":
+            raise ValueError("--hashed-embeddings has no tokenizer, run with CHUNKING_STRATEGY=characters")
+        embedding_service._embeddings = CachedEmbeddings(
+            HashedEmbeddings(), "hashed-384", cache_path=os.path.join(scratch_dir, "embedding_cache.db")
+        )
+
+    db = Database(os.path.join(scratch_dir, "app.db"))
+    processor = DocumentProcessor(db)
+    processor.vectorstore_path = os.path.join(scratch_dir, "chroma")
+    processor.page_cache = PageCache(os.path.join(scratch_dir, "page_cache.db"))
+    ingestion_queue = IngestionQueue(db, processor, num_workers=workers or INGESTION_WORKERS)
+
+    users = {}
+    for uploader in sorted({entry["uploader"] for entry in entries}):
+        users[uploader] = db.create_user(uploader, "benchmark", "faculty") or db.get_user(uploader)["id"]
+
+    by_uploader: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        entry["doc_id"] = f"synthetic-{os.path.splitext(entry['file'])[0]}"
+        by_uploader.setdefault(entry["uploader"], []).append(entry)
+
+    batch_ids = []
+    start = time.perf_counter()
+    with PeakMemorySampler() as sampler:
+        ingestion_queue.start()
+        for uploader, uploads in by_uploader.items():
+            for offset in range(0, len(uploads), upload_size):
+                batch = [{
+                    "doc_id": entry["doc_id"],
+                    "filename": entry["file"],
+                    "file_path": os.path.join(corpus, entry["file"]),
+                    "uploaded_by": users[uploader],
+                    "course_name": entry["course"]
+                } for entry in uploads[offset:offset + upload_size]]
+                batch_id = f"synthetic-{uploader}-{offset}"
+                db.create_documents(batch, batch_id=batch_id)
+                ingestion_queue.submit_batch([document["doc_id"] for document in batch])
+                batch_ids.append(batch_id)
+
+        while True:
+            progress = [db.get_batch_progress(batch_id) for batch_id in batch_ids]
+            done = sum(p["completed"] + p["failed"] for p in progress)
+            print(f"\r{done}/{len(entries)} documents ingested", end="", flush=True)
+            if done >= len(entries):
+                break
+            time.sleep(1)
+        print()
+        ingestion_queue.stop()
+    seconds = time.perf_counter() - start
+
+    documents = [db.get_document(entry["doc_id"]) for entry in entries]
+    completed = [doc for doc in documents if doc["status"] == "completed"]
+    chunks = sum(doc["chunks_created"] or 0 for doc in completed if not doc["source_doc_id"])
+    pages = sum(entry["pages"] for entry in entries)
+    return {
+        "documents": len(entries),
+        "completed": len(completed),
+        "failed": len(documents) - len(completed),
+        "deduplicated": sum(1 for doc in completed if doc["source_doc_id"]),
+        "pages": pages,
+        "chunks_indexed": chunks,
+        "seconds": round(seconds, 2),
+        "documents_per_second": round(len(entries) / seconds, 2),
+        "pages_per_second": round(pages / seconds, 2),
+        "chunks_per_second": round(chunks / seconds, 2),
+        "index_bytes": directory_size(processor.vectorstore_path),
+        "database_bytes": os.path.getsize(db.db_path),
+        "peak_rss_mb": round(sampler.peak_bytes / (1024 * 1024), 1),
+        "doc_ids": {entry["file"]: entry["doc_id"] for entry in entries},
+        "db": db,
+        "vectorstore_path": processor.vectorstore_path
+    }
+
+
+def measure_queries(queries: List[Dict], doc_ids: Dict[str, str], db, vectorstore_path: str) -> Dict:
+    """Query latency and hit rate through the same retrieval RAGEngine uses"""
+    from langchain_chroma import Chroma
+    from services.document_directory import DocumentDirectory
+    from services.embedding_service import get_embeddings
+    from services.retrieval import retrieve
+
+    # Same collection, candidate filtering and visibility rules as RAGEngine, without the LLM
+    vectorstore = Chroma(
+        collection_name="faculty_documents",
+        embedding_function=get_embeddings(),
+        persist_directory=vectorstore_path
+    )
+    directory = DocumentDirectory(db)
+    latencies, hits = [], 0
+    for query in queries:
+        if query["file"] not in doc_ids:
+            continue
+        # Identical uploads share their source's vectors, deduplicated chunks are owned by another document
+        expected = db.resolve_vector_doc_ids([doc_ids[query["file"]]])[0]
+        shared_hashes = {ref["chunk_hash"] for ref in db.get_chunk_references([expected])}
+        start = time.perf_counter()
+        results = retrieve(vectorstore, directory, query["query"])
+        latencies.append(time.perf_counter() - start)
+        hits += any(
+            result.metadata.get("doc_id") == expected or result.metadata.get("chunk_hash") in shared_hashes
+            for result in results
+        )
+    if not latencies:
+        return {"queries": 0}
+
+    latencies.sort()
+    return {
+        "queries": len(latencies),
+        "hit_rate": round(hits / len(latencies), 4),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2)
+        }
+    }
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _cumulative(values) -> Iterator[float]:
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + [line] if line else lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_range(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and bulk-load a synthetic course corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic corpus and its manifest")
+    generate.add_argument("--output", required=True, help="Directory to write the corpus to")
+    generate.add_argument("--documents", type=int, default=100)
+    generate.add_argument("--pages", type=_page_range, default=(5, 40), help="Page count range, e.g. 5-40")
+    generate.add_argument("--words-per-page", type=int, default=350)
+    generate.add_argument("--vocabulary", type=int, default=20000, help="Distinct words")
+    generate.add_argument("--courses", type=int, default=20)
+    generate.add_argument("--uploaders", type=int, default=10)
+    generate.add_argument("--duplicate-rate", type=float, default=0.05, help="Share of byte-identical re-uploads")
+    generate.add_argument("--near-duplicate-rate", type=float, default=0.05, help="Share of revised copies")
+    generate.add_argument("--pdf-share", type=float, default=1.0, help="Share of PDFs, the rest are text files")
+    generate.add_argument("--queries", type=int, default=200, help="Queries to sample into the manifest")
+    generate.add_argument("--seed", type=int, default=0)
+
+    load = commands.add_parser("load", help="Ingest a generated corpus into a scratch store and measure it")
+    load.add_argument("--corpus", required=True, help="Directory written by generate")
+    load.add_argument("--output", default="corpus_load.json", help="Where to write JSON results")
+    load.add_argument("--scratch", default=None, help="Keep the scratch store in this directory")
+    load.add_argument("--limit", type=int, default=None, help="Only load the first N documents")
+    load.add_argument("--workers", type=int, default=None, help="Ingestion workers")
+    load.add_argument("--upload-size", type=int, default=50, help="Documents per simulated batch upload")
+    load.add_argument("--hashed-embeddings", action="store_true", help="Embed with feature hashing, not the model")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        start = time.perf_counter()
+        generator = CorpusGenerator(
+            documents=args.documents, pages=args.pages, words_per_page=args.words_per_page,
+            vocabulary_size=args.vocabulary, courses=args.courses, uploaders=args.uploaders,
+            duplicate_rate=args.duplicate_rate, near_duplicate_rate=args.near_duplicate_rate,
+            pdf_share=args.pdf_share, queries=args.queries, seed=args.seed
+        )
+        manifest = generator.generate(args.output)
+        pages = sum(entry["pages"] for entry in manifest["documents"])
+        print(f"Wrote {len(manifest['documents'])} documents ({pages} pages, {directory_size(args.output)} bytes) "
+              f"to {args.output} in {time.perf_counter() - start:.1f}s")
+        return
+
+    scratch_dir = args.scratch or tempfile.mkdtemp(prefix="corpus_load_")
+    os.makedirs(scratch_dir, exist_ok=True)
+    try:
+        results = bulk_load(args.corpus, scratch_dir, args.hashed_embeddings, args.workers,
+                            args.upload_size, args.limit)
+        with open(os.path.join(args.corpus, "manifest.json")) as f:
+            queries = json.load(f)["queries"]
+        results["retrieval"] = measure_queries(
+            queries, results.pop("doc_ids"), results.pop("db"), results.pop("vectorstore_path")
+        )
+    finally:
+        if not args.scratch:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "corpus": os.path.abspath(args.corpus),
+        "hashed_embeddings": args.hashed_embeddings,
+        **results
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    retrieval = results["retrieval"]
+    print(f"Documents: {results['completed']}/{results['documents']} ({results['deduplicated']} deduplicated)  "
+          f"Chunks: {results['chunks_indexed']}  Time: {results['seconds']}s  "
+          f"Chunks/s: {results['chunks_per_second']}")
+    print(f"Index: {results['index_bytes'] / 1024 / 1024:.1f} MB  Peak RSS: {results['peak_rss_mb']} MB")
+    if retrieval.get("queries"):
+        print(f"Queries: {retrieval['queries']}  Hit rate: {retrieval['hit_rate']}  "
+              f"Latency ms: {retrieval['latency_ms']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+PDF Extractor Benchmark
+Compares the speed and text fidelity of the installed PDF extraction engines
+
+Usage (from the Minor directory):
+    python -m benchmarks.extractor_benchmark --corpus ../data/uploads --output extractors.json
+
+Fidelity is measured against a reference engine (pypdf by default):
+- word trigram recall/precision of each engine's text against the reference
+- retrieval hit rate: sentences sampled from the reference text are used as
+  queries against each engine's chunks; a hit means a top-k chunk contains
+  most of the query's words. This needs the embeddings model (--retrieval).
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EXTRACTION_WORKERS
+from services.chunking import create_chunker
+from services.extractors import available_extractors
+from services.text_extraction import iter_pdf_pages
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def _trigrams(words: List[str]) -> Set[Tuple[str, str, str]]:
+    return set(zip(words, words[1:], words[2:]))
+
+
+def text_fidelity(reference: str, candidate: str) -> Dict:
+    """Word trigram overlap between an engine's text and the reference text"""
+    ref, cand = _trigrams(_words(reference)), _trigrams(_words(candidate))
+    overlap = len(ref & cand)
+    return {
+        "trigram_recall": round(overlap / len(ref), 4) if ref else None,
+        "trigram_precision": round(overlap / len(cand), 4) if cand else None
+    }
+
+
+def sample_queries(text: str, count: int, seed: int = 0) -> List[str]:
+    """Pick sentences of 8-30 words from the reference text"""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text)]
+    sentences = [s for s in sentences if 8 <= len(_words(s)) <= 30]
+    random.Random(seed).shuffle(sentences)
+    return sentences[:count]
+
+
+def retrieval_hit_rate(queries: List[str], chunks: List[str], embeddings, top_k: int) -> float:
+    """Share of queries whose top-k chunks contain at least 60% of the query words"""
+    import numpy as np
+
+    if not queries or not chunks:
+        return 0.0
+    chunk_vectors = np.array(embeddings.embed_documents(chunks))
+    chunk_words = [set(_words(chunk)) for chunk in chunks]
+    hits = 0
+    for query in queries:
+        scores = chunk_vectors @ np.array(embeddings.embed_query(query))
+        query_words = set(_words(query))
+        for index in np.argsort(-scores)[:top_k]:
+            if len(query_words & chunk_words[index]) >= 0.6 * len(query_words):
+                hits += 1
+                break
+    return round(hits / len(queries), 4)
+
+
+def run(corpus: str, engines: List[str], reference: str, limit: int = None,
+        retrieval: bool = False, queries_per_document: int = 10, top_k: int = 4) -> Dict:
+    """Extract every PDF with every engine and compare against the reference engine"""
+    files = sorted(glob.glob(os.path.join(corpus, "**", "*.pdf"), recursive=True))[:limit]
+    if not files:
+        raise ValueError(f"No PDF files found in {corpus}")
+
+    embeddings, chunker = None, None
+    if retrieval:
+        from services.embedding_service import get_embeddings
+        # Raw model: the cache would make later engines look faster than they are
+        embeddings = get_embeddings().embeddings
+        chunker = create_chunker()
+
+    results = {engine: {"seconds": 0.0, "pages": 0, "characters": 0, "errors": 0, "documents": []}
+               for engine in engines}
+    for file_path in files:
+        texts = {}
+        for engine in engines:
+            start = time.perf_counter()
+            try:
+                pages = list(iter_pdf_pages(file_path, engine=engine))
+            except Exception as e:
+                results[engine]["errors"] += 1
+                results[engine]["documents"].append({"file": os.path.basename(file_path), "error": str(e)})
+                continue
+            elapsed = time.perf_counter() - start
+            texts[engine] = "\n".join(pages)
+            results[engine]["seconds"] += elapsed
+            results[engine]["pages"] += len(pages)
+            results[engine]["characters"] += len(texts[engine])
+            results[engine]["documents"].append({
+                "file": os.path.basename(file_path),
+                "pages": len(pages),
+                "seconds": round(elapsed, 4)
+            })
+
+        reference_text = texts.get(reference)
+        if reference_text is None:
+            continue
+        queries = sample_queries(reference_text, queries_per_document) if retrieval else []
+        for engine, text in texts.items():
+            document = results[engine]["documents"][-1]
+            document.update(text_fidelity(reference_text, text))
+            if retrieval:
+                chunks = list(chunker.iter_chunks([text]))
+                document["retrieval_hit_rate"] = retrieval_hit_rate(queries, chunks, embeddings, top_k)
+        print(f"{os.path.basename(file_path)[:60]:60} " + "  ".join(
+            f"{engine} {results[engine]['documents'][-1].get('seconds', 0):.2f}s" for engine in texts
+        ))
+
+    summary = {}
+    for engine, result in results.items():
+        scored = [d for d in result["documents"] if "trigram_recall" in d]
+
+        def mean(key):
+            values = [d[key] for d in scored if d.get(key) is not None]
+            return round(sum(values) / len(values), 4) if values else None
+
+        summary[engine] = {
+            "pages_per_second": round(result["pages"] / result["seconds"], 2) if result["seconds"] else None,
+            "seconds": round(result["seconds"], 4),
+            "characters": result["characters"],
+            "errors": result["errors"],
+            "trigram_recall": mean("trigram_recall"),
+            "trigram_precision": mean("trigram_precision"),
+            "retrieval_hit_rate": mean("retrieval_hit_rate") if retrieval else None
+        }
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "engines": engines,
+            "reference": reference,
+            "extraction_workers": EXTRACTION_WORKERS,
+            "retrieval": retrieval,
+            "queries_per_document": queries_per_document,
+            "top_k": top_k
+        },
+        "summary": summary,
+        "engines": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF extraction engines")
+    parser.add_argument("--corpus", default=os.path.join("..", "data", "uploads"), help="Directory of PDFs")
+    parser.add_argument("--output", default="extractor_benchmark.json", help="Where to write JSON results")
+    parser.add_argument("--engines", nargs="*", default=None, help="Engines to compare (default: all installed)")
+    parser.add_argument("--reference", default="pypdf", help="Engine whose text is the fidelity reference")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N files")
+    parser.add_argument("--retrieval", action="store_true", help="Also measure retrieval hit rate")
+    parser.add_argument("--top-k", type=int, default=4, help="Chunks retrieved per query")
+    args = parser.parse_args()
+
+    engines = args.engines or available_extractors()
+    if args.reference not in engines:
+        engines = [args.reference] + engines
+
+    results = run(args.corpus, engines, args.reference, limit=args.limit,
+                  retrieval=args.retrieval, top_k=args.top_k)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'engine':10} {'pages/s':>10} {'recall':>8} {'precision':>10} {'hit rate':>9} {'errors':>7}")
+    for engine, summary in results["summary"].items():
+        print(f"{engine:10} {str(summary['pages_per_second']):>10} {str(summary['trigram_recall']):>8} "
+              f"{str(summary['trigram_precision']):>10} {str(summary['retrieval_hit_rate']):>9} {summary['errors']:>7}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
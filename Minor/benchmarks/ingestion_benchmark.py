@@ -0,0 +1,247 @@
+"""
+Ingestion Throughput Benchmark
+Runs the ingestion pipeline over a PDF corpus and reports per-stage timings
+
+Usage (from the Minor directory):
+    python -m benchmarks.ingestion_benchmark --corpus ../data/uploads --output bench.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_chroma import Chroma
+
+from config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, CHUNKING_STRATEGY, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
+    EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EXTRACTION_WORKERS, INGESTION_BATCH_SIZE, STRIP_BOILERPLATE
+)
+from services.chunking import create_chunker
+from services.document_processor import DocumentProcessor
+from services.embedding_service import get_embeddings
+from services.page_cache import PageCache
+from services.text_cleaning import BoilerplateFilter
+from services.text_extraction import iter_pdf_pages
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class PeakMemorySampler:
+    """Tracks peak RSS of this process and its extraction workers"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _rss(self) -> int:
+        if psutil is None:
+            import resource
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            scale = 1 if platform.system() == "Darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._rss())
+
+
+def benchmark_stages(file_path: str, embeddings, vectorstore: Chroma) -> Dict:
+    """Run extract, split, embed and store one after the other and time each stage"""
+    timings = {}
+
+    start = time.perf_counter()
+    pages = list(iter_pdf_pages(file_path))
+    timings["extract"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaner = BoilerplateFilter()
+    chunks = list(create_chunker().iter_chunks(cleaner.strip(pages) if STRIP_BOILERPLATE else pages))
+    timings["split"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(chunks) if chunks else []
+    timings["embed"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    name = os.path.basename(file_path)
+    for offset in range(0, len(chunks), INGESTION_BATCH_SIZE):
+        end = offset + INGESTION_BATCH_SIZE
+        vectorstore._collection.upsert(
+            ids=[f"{name}:{i}" for i in range(offset, min(end, len(chunks)))],
+            embeddings=vectors[offset:end],
+            documents=chunks[offset:end],
+            metadatas=[{"doc_id": name}] * len(chunks[offset:end])
+        )
+    timings["store"] = time.perf_counter() - start
+
+    return {
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "characters": sum(len(page) for page in pages),
+        "boilerplate_chars_removed": cleaner.characters_removed,
+        "stage_seconds": timings
+    }
+
+
+def benchmark_pipeline(file_path: str, processor: DocumentProcessor, doc_id: str) -> float:
+    """Time the real streaming DocumentProcessor.process_pdf end to end"""
+    start = time.perf_counter()
+    processor.process_pdf(file_path, doc_id, os.path.basename(file_path), "benchmark")
+    return time.perf_counter() - start
+
+
+def summarize(documents: List[Dict]) -> Dict:
+    """Aggregate throughput over the corpus"""
+    stages = ["extract", "split", "embed", "store"]
+    stage_totals = {stage: sum(d["stage_seconds"][stage] for d in documents) for stage in stages}
+    pages = sum(d["pages"] for d in documents)
+    chunks = sum(d["chunks"] for d in documents)
+    characters = sum(d["characters"] for d in documents)
+    removed = sum(d["boilerplate_chars_removed"] for d in documents)
+    pipeline_seconds = sum(d["pipeline_seconds"] for d in documents)
+
+    def rate(count, seconds):
+        return round(count / seconds, 2) if seconds > 0 else None
+
+    return {
+        "documents": len(documents),
+        "pages": pages,
+        "chunks": chunks,
+        "boilerplate_chars_removed": removed,
+        "boilerplate_share": round(removed / characters, 4) if characters else None,
+        "stage_seconds": {stage: round(seconds, 4) for stage, seconds in stage_totals.items()},
+        "pages_per_second": rate(pages, stage_totals["extract"]),
+        "chunks_per_second": rate(chunks, stage_totals["split"]),
+        "embeddings_per_second": rate(chunks, stage_totals["embed"]),
+        "stored_per_second": rate(chunks, stage_totals["store"]),
+        "pipeline_seconds": round(pipeline_seconds, 4),
+        "pipeline_pages_per_second": rate(pages, pipeline_seconds)
+    }
+
+
+def run(corpus: str, limit: int = None, repeat: int = 1, use_cache: bool = False) -> Dict:
+    """Benchmark every PDF in the corpus against a scratch vector store"""
+    files = sorted(glob.glob(os.path.join(corpus, "**", "*.pdf"), recursive=True))[:limit]
+    if not files:
+        raise ValueError(f"No PDF files found in {corpus}")
+
+    # Warm the model up so the first document does not pay for loading it
+    shared = get_embeddings()
+    shared.embed_query("warm up")
+    # The raw model measures real embedding cost; the cache would hide it after one pass
+    embeddings = shared if use_cache else shared.embeddings
+
+    scratch_dir = tempfile.mkdtemp(prefix="ingestion_bench_")
+    try:
+        vectorstore = Chroma(
+            collection_name="benchmark_stages",
+            embedding_function=shared,
+            persist_directory=os.path.join(scratch_dir, "stages")
+        )
+        processor = DocumentProcessor()
+        processor.vectorstore_path = os.path.join(scratch_dir, "pipeline")
+        if not use_cache:
+            processor.embedding_model = shared.embeddings
+
+        documents = []
+        with PeakMemorySampler() as sampler:
+            for iteration in range(repeat):
+                # Every pass extracts from the PDFs again unless caches are measured too
+                if iteration == 0 or not use_cache:
+                    processor.page_cache = PageCache(os.path.join(scratch_dir, f"page_cache-{iteration}.db"))
+                for index, file_path in enumerate(files):
+                    result = benchmark_stages(file_path, embeddings, vectorstore)
+                    result["pipeline_seconds"] = benchmark_pipeline(
+                        file_path, processor, f"bench-{iteration}-{index}"
+                    )
+                    result["file"] = os.path.basename(file_path)
+                    result["size_bytes"] = os.path.getsize(file_path)
+                    documents.append(result)
+                    print(
+                        f"{result['file'][:48]:48} {result['pages']:5} pages {result['chunks']:6} chunks  "
+                        + "  ".join(f"{k} {v:.2f}s" for k, v in result["stage_seconds"].items())
+                    )
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {
+            "embedding_model": EMBEDDING_MODEL,
+            "embedding_batch_size": EMBEDDING_BATCH_SIZE,
+            "ingestion_batch_size": INGESTION_BATCH_SIZE,
+            "extraction_workers": EXTRACTION_WORKERS,
+            "chunking_strategy": CHUNKING_STRATEGY,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "chunk_tokens": CHUNK_TOKENS,
+            "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+            "strip_boilerplate": STRIP_BOILERPLATE,
+            "embedding_cache": use_cache,
+            "repeat": repeat
+        },
+        "peak_rss_mb": round(sampler.peak_bytes / (1024 * 1024), 1),
+        "summary": summarize(documents),
+        "documents": documents
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document ingestion throughput")
+    parser.add_argument("--corpus", default=os.path.join("..", "data", "uploads"), help="Directory of PDFs")
+    parser.add_argument("--output", default="ingestion_benchmark.json", help="Where to write JSON results")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N files")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Embed through the persistent embedding cache and keep extracted pages between passes")
+    args = parser.parse_args()
+
+    results = run(args.corpus, limit=args.limit, repeat=args.repeat, use_cache=args.use_cache)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    summary = results["summary"]
+    print(f"\nDocuments: {summary['documents']}  Pages: {summary['pages']}  Chunks: {summary['chunks']}")
+    print(f"Pages/s: {summary['pages_per_second']}  Chunks/s: {summary['chunks_per_second']}  "
+          f"Embeddings/s: {summary['embeddings_per_second']}  Peak RSS: {results['peak_rss_mb']} MB")
+    print(f"Boilerplate dropped: {summary['boilerplate_chars_removed']} characters ({summary['boilerplate_share']})")
+    print(f"Stage seconds: {summary['stage_seconds']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
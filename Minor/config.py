@@ -13,6 +13,8 @@ CHROMA_DB_DIR = DATA_DIR / "chroma"
 
 # Database
 DB_PATH = DATA_DIR / "college_ai.db"
+EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.db"
+PAGE_CACHE_PATH = DATA_DIR / "page_cache.db"
 
 # Create directories if they don't exist
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
@@ -21,14 +23,56 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 # Convert to strings for compatibility
 DB_PATH = str(DB_PATH)
+EMBEDDING_CACHE_PATH = str(EMBEDDING_CACHE_PATH)
+PAGE_CACHE_PATH = str(PAGE_CACHE_PATH)
 UPLOADS_DIR = str(UPLOADS_DIR)
 CHROMA_DB_DIR = str(CHROMA_DB_DIR)
 
 # HuggingFace settings
 HUGGINGFACE_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 32  # Texts per model forward pass
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
 
 # Application settings
 MAX_UPLOAD_SIZE_MB = 50
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
\ No newline at end of file
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.pptx', '.txt', '.md', '.html', '.htm')
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "tokens")  # tokens or characters
+CHUNK_SIZE = 1000  # characters, used by the 'characters' strategy
+CHUNK_OVERLAP = 200
+CHUNK_TOKENS = 0  # embedding tokens per chunk, 0 uses the full model window
+CHUNK_OVERLAP_TOKENS = 32
+STRIP_BOILERPLATE = os.getenv("STRIP_BOILERPLATE", "true").lower() == "true"
+BOILERPLATE_SAMPLE_PAGES = 24  # Pages read ahead to learn running headers and footers
+BOILERPLATE_MIN_PAGE_RATIO = 0.5  # A line repeated on this share of pages is boilerplate
+
+# Ingestion settings
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_BATCH_PAGES = 16
+EXTRACTION_TIMEOUT_SECONDS = int(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "300"))  # Per document
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "2048"))  # Per extraction worker, 0 disables
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "pypdf")  # pypdf, pypdf2, pymupdf or pdfminer
+OCR_ENABLED = os.getenv("OCR_ENABLED", "true").lower() == "true"  # Needs pymupdf, pytesseract and Tesseract
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))  # Separate, low-priority pool
+OCR_NICE = 10  # Scheduling priority drop for OCR workers
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_DPI = 200
+OCR_MIN_PAGE_CHARS = 20  # Pages with less extracted text are OCRed
+OCR_PAGE_TIMEOUT_SECONDS = 120
+INGESTION_BATCH_SIZE = 64  # Chunks embedded and written per batch
+BULK_INGESTION_BATCH_SIZE = 256  # Chunks per batch when several files are ingested together
+VECTOR_WRITE_BATCH_SIZE = 1024  # Vectors per upsert once batches from all workers are coalesced
+VECTOR_WRITE_MAX_WAIT_MS = 25  # How long the writer waits for other workers' batches to join a write
+INGESTION_HEARTBEAT_SECONDS = 15  # How often running jobs are marked alive and stale ones reaped
+INGESTION_STALE_SECONDS = int(os.getenv("INGESTION_STALE_SECONDS", "120"))  # Silence before a job counts as dead
+INGESTION_MAX_ATTEMPTS = 3
+INGESTION_RETRY_BACKOFF_SECONDS = 30  # Doubles with every attempt
+INGESTION_SMALL_DOCUMENT_MB = 2  # Documents up to this size are scheduled ahead of large ones
+INGESTION_PRIORITY_AGING_SECONDS = 300  # Waiting this long raises a job one priority level
+INGESTION_BATCH_JOB_MB = 16  # Batch uploads are split into jobs of about this size
+INGESTION_INITIAL_MB_PER_SECOND = 0.5  # Throughput assumed for wait estimates until measured
+
+# Retrieval settings
+RETRIEVAL_TOP_K = 4  # Chunks passed to the LLM per question
+RETRIEVAL_FETCH_K = 12  # Candidates fetched, so chunks of documents still being ingested can be skipped
@@ -12,6 +12,7 @@ from utils.ui_components import (
 from services.database import Database
 from services.analytics import AnalyticsService
 from utils.auth import create_user, hash_password
+from utils.ingestion import get_ingestion_queue
 
 # Page config
 st.set_page_config(
@@ -222,6 +223,33 @@ with tab3:
     if search_doc:
         st.info(f"Searching for: {search_doc}")
         # Add search functionality
+    
+    st.markdown("---")
+    
+    # Re-chunk indexed documents, e.g. after the chunking settings changed
+    st.markdown("#### ♻️ Re-index Documents")
+    st.caption("Page text is read from the page cache and only chunks whose text changed are re-embedded.")
+    
+    indexed_docs = [doc for doc in db.get_all_documents() if doc['status'] == 'completed' and not doc['source_doc_id']]
+    if indexed_docs:
+        labels = {doc['id']: f"{doc['filename']} ({doc['course_name'] or 'No course'})" for doc in indexed_docs}
+        selected = st.multiselect(
+            "Documents to re-index:",
+            options=list(labels),
+            format_func=lambda doc_id: labels[doc_id]
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            reindex_selected = st.button("♻️ Re-index Selected", disabled=not selected, use_container_width=True)
+        with col2:
+            reindex_all = st.button("♻️ Re-index All", use_container_width=True)
+        
+        if reindex_selected or reindex_all:
+            queued = get_ingestion_queue().submit_reindex(list(labels) if reindex_all else selected)
+            st.success(f"✅ Queued {queued} documents for re-indexing")
+    else:
+        st.info("No indexed documents yet")
 
 with tab4:
     st.markdown("### 📈 Advanced Analytics")
@@ -4,18 +4,19 @@ Faculty Portal - Document Upload & Content Generation
 
 import streamlit as st
 import asyncio
-import time
 from datetime import datetime
 from utils.ui_components import (
     check_authentication, render_document_card,
     render_question_card, render_progress_bar, render_info_box,
     format_questions_for_txt
 )
-from services.document_processor import DocumentProcessor
 from services.question_generator import QuestionGenerator
 from services.rag_engine import RAGEngine
 from services.database import Database
 from services.analytics import AnalyticsService
+from utils.ingestion import get_ingestion_queue
+from utils.uploads import expand_uploads, save_uploaded_file
+from config import SUPPORTED_EXTENSIONS, MAX_UPLOAD_SIZE_MB
 import os
 import uuid
 import json
@@ -36,14 +37,17 @@ check_authentication()
 def init_services():
     db = Database()
     return (
-        DocumentProcessor(),
         QuestionGenerator(),
-        RAGEngine(),
+        RAGEngine(db),
         db,
         AnalyticsService(db)
     )
 
-doc_processor, question_gen, rag_engine, db, analytics = init_services()
+question_gen, rag_engine, db, analytics = init_services()
+
+# Shared with the Admin Dashboard, which can re-index documents
+ingestion_queue = get_ingestion_queue()
+doc_processor = ingestion_queue.doc_processor
 
 # Async helper function for Streamlit context
 @st.cache_resource
@@ -78,17 +82,18 @@ with tab1:
     
     render_info_box(
         "Document Upload",
-        "Upload PDF files containing your course materials. The system will automatically process and index them for student queries.",
+        "Upload PDFs, Word documents, slide decks, text or HTML files containing your course materials. The system will automatically process and index them for student queries.",
         "📄"
     )
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        uploaded_file = st.file_uploader(
-            "Choose a PDF file",
-            type=['pdf'],
-            help="Upload course notes, textbooks, or any educational PDF"
+        uploaded_files = st.file_uploader(
+            "Choose documents or ZIP archives",
+            type=[extension.lstrip('.') for extension in SUPPORTED_EXTENSIONS] + ['zip'],
+            accept_multiple_files=True,
+            help="Upload course notes, slides, textbooks, or any educational document. A ZIP of documents is processed as one batch."
         )
         
         course_name = st.text_input(
@@ -98,90 +103,70 @@ with tab1:
     
     with col2:
         st.markdown("### ℹ️ Upload Guidelines")
-        st.markdown("""
-        - Max file size: 50MB
-        - Format: PDF only
+        st.markdown(f"""
+        - Max file size: {MAX_UPLOAD_SIZE_MB}MB
+        - Format: PDF, DOCX, PPTX, TXT, Markdown, HTML, or a ZIP of these
         - Clear, readable text
         - Properly formatted content
         """)
     
     if st.button("🚀 Upload & Process", type="primary", use_container_width=True):
-        if uploaded_file and course_name:
-            with st.spinner("📤 Uploading and processing document..."):
+        if uploaded_files and course_name:
+            with st.spinner("📤 Uploading documents..."):
                 try:
-                    doc_id = str(uuid.uuid4())
-                    upload_dir = "data/uploads"
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
-                    file_path = os.path.join(upload_dir, f"{doc_id}_{uploaded_file.name}")
-                    
-                    with open(file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    
-                    # Save to database
-                    db.create_document(
-                        doc_id=doc_id,
-                        filename=uploaded_file.name,
-                        file_path=file_path,
-                        uploaded_by=st.session_state.user_id,
-                        course_name=course_name,
-                        status="processing"
-                    )
-                    
-                    # Process document asynchronously
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
+                    documents = expand_uploads(uploaded_files, "data/uploads")
+                    if not documents:
+                        raise ValueError("No supported documents found in the upload")
                     
-                    status_text.text("📄 Extracting text from PDF...")
-                    progress_bar.progress(25)
-                    
-                    result = doc_processor.process_pdf(
-                        file_path=file_path,
-                        doc_id=doc_id,
-                        filename=uploaded_file.name,
-                        uploaded_by=st.session_state.user_id
-                    )
-                    
-                    status_text.text("✂️ Splitting into chunks...")
-                    progress_bar.progress(50)
-                    time.sleep(0.5)
-                    
-                    status_text.text("🧠 Generating embeddings...")
-                    progress_bar.progress(75)
-                    time.sleep(0.5)
-                    
-                    # Update database
-                    db.update_document_status(
-                        doc_id,
-                        "completed",
-                        chunks_created=result['chunks_created']
-                    )
+                    for document in documents:
+                        document['uploaded_by'] = st.session_state.user_id
+                        document['course_name'] = course_name
                     
-                    status_text.text("✅ Storing in vector database...")
-                    progress_bar.progress(100)
-                    
-                    # Log analytics
-                    analytics.log_document_processed(
-                        st.session_state.user_id,
-                        doc_id,
-                        result['chunks_created']
-                    )
+                    # Register every document in one transaction and hand off to the background workers
+                    batch_id = str(uuid.uuid4())
+                    db.create_documents(documents, batch_id=batch_id)
+                    doc_ids = [document['doc_id'] for document in documents]
+                    if len(doc_ids) == 1:
+                        ingestion_queue.submit(doc_ids[0])
+                    else:
+                        ingestion_queue.submit_batch(doc_ids)
+                    st.session_state.upload_batch_id = batch_id
                     
                     st.success(f"""
-                    ✅ **Document processed successfully!**
-                    - Filename: {uploaded_file.name}
-                    - Chunks created: {result['chunks_created']}
-                    - Status: Ready for student queries
+                    ✅ **{len(documents)} document(s) uploaded successfully!**
+                    - Files: {', '.join(document['filename'] for document in documents[:5])}{' ...' if len(documents) > 5 else ''}
+                    - Status: Queued for processing
                     """)
                     
-                    time.sleep(2)
-                    st.rerun()
-                    
                 except Exception as e:
-                    st.error(f"❌ Processing failed: {str(e)}")
-                    db.update_document_status(doc_id, "failed", error_message=str(e))
+                    st.error(f"❌ Upload failed: {str(e)}")
         else:
             st.warning("⚠️ Please upload a file and enter course name")
+    
+    # Combined progress of the latest upload batch
+    if st.session_state.get('upload_batch_id'):
+        progress = db.get_batch_progress(st.session_state.upload_batch_id)
+        if progress['total']:
+            done = progress['completed'] + progress['failed']
+            st.markdown("#### ⏳ Upload Progress")
+            render_progress_bar(done, progress['total'], label="Documents processed")
+            st.caption(
+                f"✅ {progress['completed']} completed · ❌ {progress['failed']} failed · "
+                f"⚙️ {progress['processing']} processing · 🕒 {progress['queued']} queued"
+            )
+            queue_status = ingestion_queue.user_queue_status(st.session_state.user_id)
+            if queue_status['expected_wait_seconds'] is not None:
+                st.caption(
+                    f"🕒 {queue_status['queued_documents']} of your document(s) waiting, "
+                    f"next one starts in about {int(queue_status['expected_wait_seconds'])} s"
+                )
+            for live in doc_processor.progress.active(uploaded_by=st.session_state.user_id):
+                pages = f"{live.pages_extracted}/{live.pages_total or '?'} pages"
+                chunks = f"{live.vectors_written}/{live.chunks_total or '?'} chunks stored"
+                eta = f" · about {int(live.eta_seconds)} s left" if live.eta_seconds is not None else ""
+                st.progress(live.fraction, text=f"📄 {live.filename}: {pages} · {chunks}{eta}")
+            if done < progress['total'] and st.button("🔄 Refresh progress"):
+                st.rerun()
 
 with tab2:
     st.markdown("### 📚 My Uploaded Documents")
@@ -192,6 +177,12 @@ with tab2:
     if documents:
         st.info(f"📊 Total documents: {len(documents)}")
         
+        in_progress = sum(1 for d in documents if d['status'] in ('queued', 'processing'))
+        if in_progress:
+            st.caption(f"⏳ {in_progress} document(s) queued or processing in the background")
+            if st.button("🔄 Refresh status"):
+                st.rerun()
+        
         # Filter options
         col1, col2 = st.columns(2)
         with col1:
@@ -217,15 +208,49 @@ with tab2:
                     st.markdown(f"**Uploaded:** {doc['created_at'][:10]}")
                     if doc['chunks_created']:
                         st.markdown(f"**Chunks:** {doc['chunks_created']}")
+                    if doc.get('source_doc_id'):
+                        st.caption("♻️ Reuses chunks of an identical upload")
                 
                 with col3:
                     if doc['status'] == 'failed':
                         st.error(f"Error: {doc['error_message']}")
+                    elif doc['error_message']:
+                        st.warning(doc['error_message'])
                     
                     if st.button(f"🗑️ Delete", key=f"del_{doc['id']}"):
-                        db.delete_document(doc['id'])
+                        vector_doc_id = doc.get('source_doc_id') or doc['id']
+                        copies = [] if doc.get('source_doc_id') else db.get_documents_by_source(doc['id'])
+                        if copies:
+                            # Identical uploads keep using the vectors, now under the first one's id
+                            rag_engine.hand_over_document(doc['id'], copies[0]['id'])
+                        owned = db.delete_document(doc['id'])
+                        if not copies and db.count_vector_references(vector_doc_id) == 0:
+                            rag_engine.delete_document(vector_doc_id, owned)
+                        doc_processor.release_pages(doc['content_hash'])
                         st.success("Document deleted!")
                         st.rerun()
+                
+                if doc['status'] == 'completed':
+                    revised_file = st.file_uploader(
+                        "Upload a revised version",
+                        type=[extension.lstrip('.') for extension in SUPPORTED_EXTENSIONS],
+                        key=f"rev_file_{doc['id']}",
+                        help="Only the changed parts of the document are re-indexed"
+                    )
+                    if revised_file and st.button("🔁 Update Document", key=f"rev_{doc['id']}"):
+                        revision_path = os.path.join(
+                            os.path.dirname(doc['file_path']),
+                            f"{doc['id']}_{uuid.uuid4().hex[:8]}_{revised_file.name}"
+                        )
+                        try:
+                            revision_hash = save_uploaded_file(revised_file, revision_path)
+                        except ValueError as e:
+                            st.error(f"❌ Upload failed: {str(e)}")
+                        else:
+                            db.queue_document_revision(doc['id'], revision_path, revision_hash)
+                            ingestion_queue.submit(doc['id'])
+                            st.success("Revision queued, only changed chunks will be re-embedded.")
+                            st.rerun()
     else:
         st.info("📭 No documents uploaded yet. Upload your first document above!")
 
@@ -275,7 +300,9 @@ with tab3:
                 with st.spinner("🤖 AI is generating content..."):
                     try:
                         # Get context from selected documents
-                        context = rag_engine.get_documents_context(selected_docs)
+                        context = rag_engine.get_documents_context(
+                            db.resolve_vector_doc_ids(selected_docs)
+                        )
                         
                         # Generate based on type
                         if "Assignment" in gen_type:
@@ -28,7 +28,7 @@ check_authentication()
 @st.cache_resource
 def init_services():
     db = Database()
-    return RAGEngine(), AnalyticsService(db), db
+    return RAGEngine(db), AnalyticsService(db), db
 
 rag_engine, analytics, db = init_services()
 
@@ -18,7 +18,8 @@ class AnalyticsService:
     
     # ==================== Logging Methods ====================
     
-    def log_document_processed(self, user_id: str, doc_id: str, chunks_created: int):
+    def log_document_processed(self, user_id: str, doc_id: str, chunks_created: int,
+                               boilerplate_chars_removed: int = 0):
         """Log document processing completion"""
         self.db.log_event(
             user_id=user_id,
@@ -26,6 +27,7 @@ class AnalyticsService:
             event_data={
                 "document_id": doc_id,
                 "chunks_created": chunks_created,
+                "boilerplate_chars_removed": boilerplate_chars_removed,
                 "timestamp": datetime.now().isoformat()
             }
         )
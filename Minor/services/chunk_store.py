@@ -0,0 +1,151 @@
+"""
+Chunk Store
+Cross-document chunk deduplication in the faculty documents collection.
+
+A chunk whose normalized text is already stored is not embedded again: the
+document records a reference to the existing vector in SQLite instead.
+The vector keeps the metadata of the document that stored it first (its
+owner). Deleting an owner hands every still-referenced vector over to one of
+its referrers, so a shared chunk lives as long as any document uses it.
+
+The document_chunks table registers the vectors each document owns, so a
+document's chunks are found without scanning the collection. Documents
+indexed before the registry existed are registered on first access.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from services.database import Database
+from services.document_directory import chunk_visible
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_BATCH_SIZE = 500
+
+
+def find_stored_chunks(collection, db: Database, chunk_hashes: List[str]) -> Dict[str, str]:
+    """
+    Map chunk hashes to the id of a retrievable vector already stored with
+    that content. Vectors of documents still being ingested, of a revision in
+    progress or retired by one are not shared: a referencing document would
+    inherit their visibility.
+    """
+    stored = {}
+    for start in range(0, len(chunk_hashes), LOOKUP_BATCH_SIZE):
+        batch = chunk_hashes[start:start + LOOKUP_BATCH_SIZE]
+        found = collection.get(where={"chunk_hash": {"$in": batch}}, include=["metadatas"])
+        labels = db.get_document_labels(list({metadata["doc_id"] for metadata in found['metadatas']}))
+        for vector_id, metadata in zip(found['ids'], found['metadatas']):
+            label = labels.get(metadata["doc_id"])
+            if label and not metadata.get("retired") and chunk_visible(label, metadata):
+                stored.setdefault(metadata["chunk_hash"], vector_id)
+    return stored
+
+
+def release_vectors(collection, db: Optional[Database], vector_ids: List[str]):
+    """
+    Delete vectors a document owns, except those other documents reference:
+    each of those is handed over to its earliest referrer, whose reference
+    becomes ownership.
+    """
+    if not vector_ids:
+        return
+    referrers = db.get_chunk_referrers(vector_ids) if db else {}
+    if referrers:
+        current = collection.get(ids=list(referrers), include=["metadatas"])
+        handed_over, metadatas = [], []
+        for vector_id, metadata in zip(current['ids'], current['metadatas']):
+            ref = referrers[vector_id]
+            handed_over.append(vector_id)
+            metadatas.append({
+                **metadata,
+                "doc_id": ref['doc_id'],
+                "chunk_index": ref['chunk_index'],
+                "start_char": ref['start_char'],
+                "end_char": ref['end_char'],
+                # Drops the previous owner's revision stamps
+                "version": None,
+                "retired": None
+            })
+        for start in range(0, len(handed_over), LOOKUP_BATCH_SIZE):
+            collection.update(
+                ids=handed_over[start:start + LOOKUP_BATCH_SIZE],
+                metadatas=metadatas[start:start + LOOKUP_BATCH_SIZE]
+            )
+        db.drop_chunk_references([(referrers[v]['doc_id'], referrers[v]['chunk_index']) for v in handed_over])
+        db.register_document_chunks([
+            (v, referrers[v]['doc_id'], referrers[v]['chunk_index']) for v in handed_over
+        ])
+        logger.info(f"Handed {len(handed_over)} shared chunks over to referencing documents")
+
+    unreferenced = [vector_id for vector_id in vector_ids if vector_id not in referrers]
+    for start in range(0, len(unreferenced), LOOKUP_BATCH_SIZE):
+        collection.delete(ids=unreferenced[start:start + LOOKUP_BATCH_SIZE])
+    if db:
+        db.unregister_document_chunks(unreferenced)
+
+
+def hand_over_document(collection, db: Database, doc_id: str, new_owner: str):
+    """
+    Make new_owner, an identical upload reusing doc_id's vectors, their owner
+    so they outlive doc_id: the vectors are stamped and registered with its id,
+    and doc_id's shared-chunk references and other copies move over to it.
+    """
+    backfill_document_chunks(collection, db, doc_id)
+    vector_ids = db.get_owned_vector_ids(doc_id)
+    retired = []
+    for start in range(0, len(vector_ids), LOOKUP_BATCH_SIZE):
+        current = collection.get(ids=vector_ids[start:start + LOOKUP_BATCH_SIZE], include=["metadatas"])
+        kept = [(vector_id, metadata) for vector_id, metadata in zip(current['ids'], current['metadatas'])
+                if not metadata.get("retired")]
+        retired.extend(vector_id for vector_id, metadata in zip(current['ids'], current['metadatas'])
+                       if metadata.get("retired"))
+        if not kept:
+            continue
+        collection.update(
+            ids=[vector_id for vector_id, _ in kept],
+            # The copy is at its first version, doc_id's revision stamps do not apply
+            metadatas=[{**metadata, "doc_id": new_owner, "version": None, "retired": None} for _, metadata in kept]
+        )
+        db.register_document_chunks([
+            (vector_id, new_owner, metadata.get("chunk_index", 0)) for vector_id, metadata in kept
+        ])
+    db.add_chunk_references(new_owner, db.get_chunk_references([doc_id]))
+    db.reassign_vector_source(doc_id, new_owner)
+    release_vectors(collection, db, retired)
+    logger.info(f"Handed {len(vector_ids) - len(retired)} chunks of {doc_id} over to its copy {new_owner}")
+
+
+def backfill_document_chunks(collection, db: Database, doc_id: str):
+    """Register the vectors of a document indexed before the chunk registry existed"""
+    if db.count_document_chunks(doc_id):
+        return
+    stored = collection.get(where={"doc_id": doc_id}, include=["metadatas"])
+    db.register_document_chunks([
+        (vector_id, doc_id, (metadata or {}).get("chunk_index", 0))
+        for vector_id, metadata in zip(stored['ids'], stored['metadatas'])
+    ])
+
+
+def release_document(collection, db: Optional[Database], doc_id: str, owned: Optional[List[str]] = None):
+    """
+    Remove a document's chunks: its references and the vectors it owns,
+    honoring references to them. `owned` are the vector ids that were
+    registered to it when its row was deleted (see Database.delete_document).
+    """
+    if not db:
+        release_vectors(collection, db, collection.get(where={"doc_id": doc_id}, include=[])['ids'])
+        return
+    db.delete_chunk_references(doc_id)
+    if owned:
+        # Vectors a batch still in flight stores later are released by its worker
+        release_vectors(collection, db, owned)
+        return
+    if db.get_document(doc_id) is None:
+        # Deleting the row dropped its registrations, and a batch still in
+        # flight may have registered some since: only the collection is complete
+        stored = collection.get(where={"doc_id": doc_id}, include=[])['ids']
+        release_vectors(collection, db, list(dict.fromkeys(db.get_owned_vector_ids(doc_id) + stored)))
+        return
+    backfill_document_chunks(collection, db, doc_id)
+    release_vectors(collection, db, db.get_owned_vector_ids(doc_id))
@@ -0,0 +1,173 @@
+"""
+Chunking Service
+Splits a stream of page texts into overlapping chunks with bounded memory
+"""
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNKING_STRATEGY, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+SENTENCE_END = ".!?"
+
+
+class Chunk(NamedTuple):
+    """A chunk and its character span in the ingested text (cleaned pages joined by newlines)"""
+    text: str
+    start_char: int
+    end_char: int
+
+
+class StreamingChunker:
+    """
+    Chunks pages as they arrive instead of materializing the whole document.
+    At most `buffer_chunks` chunks worth of text is held at any time; the last
+    chunk of every split is carried over so chunks still span page breaks.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 buffer_chunks: int = 8):
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len
+        )
+        self.buffer_limit = chunk_size * buffer_chunks
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """Yield chunk texts in document order"""
+        for chunk in self.iter_chunk_spans(pages):
+            yield chunk.text
+
+    def iter_chunk_spans(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """Yield chunks with their character offsets in document order"""
+        buffer, buffer_start = "", 0
+        for page_number, page in enumerate(pages):
+            buffer = f"{buffer}\n{page}" if page_number else page
+            if len(buffer) < self.buffer_limit:
+                continue
+            chunks = self._locate(buffer, self.splitter.split_text(buffer))
+            for text, start in chunks[:-1]:
+                yield Chunk(text, buffer_start + start, buffer_start + start + len(text))
+            # Carry the last chunk over, re-splitting from where it starts
+            consumed = chunks[-1][1] if chunks else len(buffer)
+            buffer, buffer_start = buffer[consumed:], buffer_start + consumed
+
+        if buffer.strip():
+            for text, start in self._locate(buffer, self.splitter.split_text(buffer)):
+                yield Chunk(text, buffer_start + start, buffer_start + start + len(text))
+
+    def _locate(self, buffer: str, chunks: List[str]) -> List[Tuple[str, int]]:
+        """Find each chunk's start offset; chunks appear in order, so the search only moves forward"""
+        located, position = [], 0
+        for text in chunks:
+            start = buffer.find(text, position)
+            if start < 0:
+                start = position
+            located.append((text, start))
+            position = start + 1
+        return located
+
+
+class TokenChunker:
+    """
+    Chunks by embedding-model tokens so every chunk fits the model window and
+    no text is silently truncated. Each buffer is tokenized once with offset
+    mapping, so chunking is linear in the document length. Chunks end at a
+    sentence or word boundary where possible and overlap by `overlap_tokens`.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 buffer_chunks: int = 8):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        # Roughly four characters per word-piece
+        self.buffer_limit = max_tokens * 4 * buffer_chunks
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """Yield chunk texts in document order"""
+        for chunk in self.iter_chunk_spans(pages):
+            yield chunk.text
+
+    def iter_chunk_spans(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """Yield chunks with their character offsets in document order"""
+        buffer, buffer_start = "", 0
+        for page_number, page in enumerate(pages):
+            buffer = f"{buffer}\n{page}" if page_number else page
+            if len(buffer) < self.buffer_limit:
+                continue
+            spans, consumed = self._split(buffer, final=False)
+            for start, end in spans:
+                yield Chunk(buffer[start:end], buffer_start + start, buffer_start + end)
+            buffer, buffer_start = buffer[consumed:], buffer_start + consumed
+
+        if buffer.strip():
+            spans, _ = self._split(buffer, final=True)
+            for start, end in spans:
+                yield Chunk(buffer[start:end], buffer_start + start, buffer_start + end)
+
+    def _split(self, buffer: str, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Split a buffer into character spans of at most max_tokens tokens.
+        Unless `final`, the trailing partial window is left for the next buffer;
+        returns the spans and the number of characters consumed.
+        """
+        offsets = self.tokenizer(
+            buffer, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )["offset_mapping"]
+        num_tokens = len(offsets)
+        spans = []
+        start = 0
+        while start < num_tokens:
+            end = start + self.max_tokens
+            if end >= num_tokens:
+                if not final:
+                    break
+                spans.append((offsets[start][0], offsets[-1][1]))
+                start = num_tokens
+                break
+            cut = self._boundary(buffer, offsets, start, end)
+            spans.append((offsets[start][0], offsets[cut - 1][1]))
+
+            next_start = max(cut - self.overlap_tokens, start + 1)
+            # Start the overlap at a word, not mid-word or on trailing punctuation
+            while next_start < cut and not (self._starts_word(buffer, offsets, next_start)
+                                            and buffer[offsets[next_start][0]].isalnum()):
+                next_start += 1
+            start = next_start
+
+        consumed = offsets[start][0] if start < num_tokens else len(buffer)
+        return spans, consumed
+
+    def _boundary(self, buffer: str, offsets: list, start: int, end: int) -> int:
+        """Token index to end a window at: a sentence end, else a word end, else `end`"""
+        floor = start + (end - start) * 3 // 4
+        word_cut = None
+        for cut in range(end, floor, -1):
+            if self._starts_word(buffer, offsets, cut):
+                if buffer[offsets[cut - 1][1] - 1] in SENTENCE_END:
+                    return cut
+                if word_cut is None:
+                    word_cut = cut
+        return word_cut or end
+
+    def _starts_word(self, buffer: str, offsets: list, index: int) -> bool:
+        """True if token `index` does not continue the word of the previous token"""
+        if index == 0:
+            return True
+        previous_end, current_start = offsets[index - 1][1], offsets[index][0]
+        return (current_start > previous_end
+                or not buffer[current_start].isalnum()
+                or not buffer[previous_end - 1].isalnum())
+
+
+def create_chunker(strategy: str = CHUNKING_STRATEGY):
+    """Build the configured chunker: 'tokens' (embedding tokenizer) or 'characters'"""
+    if strategy == "characters":
+        return StreamingChunker()
+    if strategy == "tokens":
+        from services.embedding_service import get_tokenizer
+        tokenizer, window = get_tokenizer()
+        return TokenChunker(tokenizer, min(CHUNK_TOKENS, window) if CHUNK_TOKENS else window)
+    raise ValueError(f"Unknown chunking strategy '{strategy}', expected 'tokens' or 'characters'")
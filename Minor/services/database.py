@@ -55,11 +55,65 @@ class Database:
                 status TEXT DEFAULT 'queued',
                 chunks_created INTEGER,
                 error_message TEXT,
+                content_hash TEXT,
+                source_doc_id TEXT,
+                revision_path TEXT,
+                revision_hash TEXT,
+                batch_id TEXT,
+                version INTEGER DEFAULT 1,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (uploaded_by) REFERENCES users(id)
             )
         ''')
+
+        # Columns added after the first release
+        self._ensure_column(cursor, 'documents', 'content_hash', 'TEXT')
+        self._ensure_column(cursor, 'documents', 'source_doc_id', 'TEXT')
+        self._ensure_column(cursor, 'documents', 'revision_path', 'TEXT')
+        self._ensure_column(cursor, 'documents', 'batch_id', 'TEXT')
+        self._ensure_column(cursor, 'documents', 'revision_hash', 'TEXT')
+        self._ensure_column(cursor, 'documents', 'version', 'INTEGER DEFAULT 1')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)')
+
+        # Ingestion journal: checkpoints of documents being processed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingestion_journal (
+                doc_id TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                content_hash TEXT,
+                chunks_stored INTEGER DEFAULT 0,
+                last_chunk_hash TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at TIMESTAMP,
+                heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (doc_id) REFERENCES documents(id)
+            )
+        ''')
+
+        # Chunks a document shares with another document instead of storing a copy
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chunk_references (
+                doc_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                vector_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                start_char INTEGER,
+                end_char INTEGER,
+                PRIMARY KEY (doc_id, chunk_index)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chunk_references_vector ON chunk_references(vector_id)')
+        
+        # Registry of the vectors each document owns, in document order
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                vector_id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_document_chunks_doc ON document_chunks(doc_id, chunk_index)')
         
         # Chat sessions table
         cursor.execute('''
@@ -115,6 +169,12 @@ class Database:
         conn.commit()
         conn.close()
     
+    def _ensure_column(self, cursor, table: str, column: str, column_type: str):
+        """Add a column to an existing table if it is missing"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+    
     def _create_default_admin(self):
         """Create default admin user if not exists"""
         try:
@@ -199,17 +259,54 @@ class Database:
     # ==================== DOCUMENT OPERATIONS ====================
     
     def create_document(self, doc_id: str, filename: str, file_path: str, 
-                       uploaded_by: str, course_name: str = None, status: str = "queued"):
-        """Create new document record"""
+                       uploaded_by: str, course_name: str = None, status: str = "queued",
+                       content_hash: str = None):
+        """Create new document record, content_hash is the file's SHA-256 if known at upload"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO documents (id, filename, file_path, uploaded_by, course_name, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (doc_id, filename, file_path, uploaded_by, course_name, status))
+            INSERT INTO documents (id, filename, file_path, uploaded_by, course_name, status, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (doc_id, filename, file_path, uploaded_by, course_name, status, content_hash))
         conn.commit()
         conn.close()
     
+    def create_documents(self, documents: List[Dict], batch_id: str = None, status: str = "queued"):
+        """Create several document records in a single transaction"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+                INSERT INTO documents (id, filename, file_path, uploaded_by, course_name, status, batch_id,
+                                       content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (doc['doc_id'], doc['filename'], doc['file_path'], doc['uploaded_by'],
+                 doc.get('course_name'), status, batch_id, doc.get('content_hash'))
+                for doc in documents
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def get_batch_progress(self, batch_id: str) -> Dict:
+        """Count the documents of an upload batch by status"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM documents WHERE batch_id = ? GROUP BY status', (batch_id,))
+        counts = {row[0]: row[1] for row in cursor.fetchall()}
+        conn.close()
+        return {
+            "total": sum(counts.values()),
+            "completed": counts.get('completed', 0),
+            "failed": counts.get('failed', 0),
+            "processing": counts.get('processing', 0),
+            "queued": counts.get('queued', 0)
+        }
+    
     def update_document_status(self, doc_id: str, status: str, 
                               chunks_created: int = None, error_message: str = None):
         """Update document processing status"""
@@ -223,6 +320,155 @@ class Database:
         conn.commit()
         conn.close()
     
+    def claim_document(self, doc_id: str) -> bool:
+        """Atomically move a queued document to processing, returns False if already claimed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE documents
+            SET status = 'processing', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'queued'
+        ''', (doc_id,))
+        claimed = cursor.rowcount == 1
+        if claimed:
+            # Checkpoints of an interrupted attempt are kept so it can resume
+            cursor.execute('''
+                INSERT INTO ingestion_journal (doc_id, stage, attempts) VALUES (?, 'claimed', 1)
+                ON CONFLICT(doc_id) DO UPDATE SET
+                    stage = 'claimed', attempts = attempts + 1,
+                    next_attempt_at = NULL, heartbeat_at = CURRENT_TIMESTAMP
+            ''', (doc_id,))
+        conn.commit()
+        conn.close()
+        return claimed
+
+    def record_ingestion_progress(self, doc_id: str, stage: str, content_hash: str = None,
+                                  chunks_stored: int = None, last_chunk_hash: str = None):
+        """Checkpoint a processing stage; also counts as a heartbeat"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE ingestion_journal
+            SET stage = ?,
+                content_hash = COALESCE(?, content_hash),
+                chunks_stored = COALESCE(?, chunks_stored),
+                last_chunk_hash = COALESCE(?, last_chunk_hash),
+                heartbeat_at = CURRENT_TIMESTAMP
+            WHERE doc_id = ?
+        ''', (stage, content_hash, chunks_stored, last_chunk_hash, doc_id))
+        conn.commit()
+        conn.close()
+
+    def get_ingestion_checkpoint(self, doc_id: str) -> Optional[Dict]:
+        """Journal entry of a document being processed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM ingestion_journal WHERE doc_id = ?', (doc_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def reset_ingestion_checkpoint(self, doc_id: str):
+        """Forget stored-chunk checkpoints, the next attempt starts from the first chunk"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE ingestion_journal
+            SET chunks_stored = 0, last_chunk_hash = NULL, content_hash = NULL
+            WHERE doc_id = ?
+        ''', (doc_id,))
+        conn.commit()
+        conn.close()
+
+    def clear_ingestion_journal(self, doc_id: str):
+        """Drop the journal entry of a finished document"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM ingestion_journal WHERE doc_id = ?', (doc_id,))
+        conn.commit()
+        conn.close()
+
+    def touch_ingestion_heartbeats(self, doc_ids: List[str]):
+        """Mark documents as still being worked on"""
+        if not doc_ids:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany(
+            'UPDATE ingestion_journal SET heartbeat_at = CURRENT_TIMESTAMP WHERE doc_id = ?',
+            [(doc_id,) for doc_id in doc_ids]
+        )
+        conn.commit()
+        conn.close()
+
+    def get_stale_documents(self, stale_seconds: int) -> List[Dict]:
+        """Documents left in 'processing' whose journal has been silent for stale_seconds"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT d.*, COALESCE(j.attempts, 1) AS attempts
+            FROM documents d
+            LEFT JOIN ingestion_journal j ON j.doc_id = d.id
+            WHERE d.status = 'processing'
+              AND COALESCE(j.heartbeat_at, d.updated_at) < datetime('now', ?)
+        ''', (f'-{int(stale_seconds)} seconds',))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def requeue_document(self, doc_id: str, delay_seconds: int) -> bool:
+        """Put a stale document back in the queue, to be retried after delay_seconds"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE documents
+            SET status = 'queued', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'processing'
+        ''', (doc_id,))
+        requeued = cursor.rowcount == 1
+        if requeued:
+            cursor.execute('''
+                INSERT INTO ingestion_journal (doc_id, stage, next_attempt_at)
+                VALUES (?, 'requeued', datetime('now', ?))
+                ON CONFLICT(doc_id) DO UPDATE SET
+                    stage = 'requeued', next_attempt_at = excluded.next_attempt_at
+            ''', (doc_id, f'+{int(delay_seconds)} seconds'))
+        conn.commit()
+        conn.close()
+        return requeued
+
+    def get_ready_documents(self) -> List[Dict]:
+        """Queued documents that are not waiting out a retry backoff, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT d.* FROM documents d
+            LEFT JOIN ingestion_journal j ON j.doc_id = d.id
+            WHERE d.status = 'queued' AND j.next_attempt_at IS NULL
+            ORDER BY d.created_at ASC
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def take_due_retries(self) -> List[str]:
+        """Ids of requeued documents whose backoff has elapsed; each is returned once"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT j.doc_id FROM ingestion_journal j
+            JOIN documents d ON d.id = j.doc_id
+            WHERE d.status = 'queued' AND j.next_attempt_at <= datetime('now')
+        ''')
+        doc_ids = [row['doc_id'] for row in cursor.fetchall()]
+        cursor.executemany(
+            'UPDATE ingestion_journal SET next_attempt_at = NULL WHERE doc_id = ?',
+            [(doc_id,) for doc_id in doc_ids]
+        )
+        conn.commit()
+        conn.close()
+        return doc_ids
+    
     def get_document(self, doc_id: str) -> Optional[Dict]:
         """Get document by ID"""
         conn = self.get_connection()
@@ -232,6 +478,272 @@ class Database:
         conn.close()
         return dict(row) if row else None
     
+    def set_document_content(self, doc_id: str, content_hash: str, source_doc_id: str = None):
+        """Record the content hash of a document and the document whose vectors it reuses"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE documents
+            SET content_hash = ?, source_doc_id = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (content_hash, source_doc_id, doc_id))
+        conn.commit()
+        conn.close()
+    
+    def get_document_by_hash(self, content_hash: str, exclude_id: str = None) -> Optional[Dict]:
+        """Get a completed document with the given content hash"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM documents
+            WHERE content_hash = ? AND status = 'completed' AND id != ?
+            ORDER BY created_at ASC
+            LIMIT 1
+        ''', (content_hash, exclude_id or ''))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    def content_in_use(self, content_hash: str) -> bool:
+        """Whether any document, or a queued revision, has the given content hash"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT 1 FROM documents WHERE content_hash = ? OR revision_hash = ? LIMIT 1
+        ''', (content_hash, content_hash))
+        row = cursor.fetchone()
+        conn.close()
+        return row is not None
+    
+    def resolve_vector_doc_ids(self, doc_ids: List[str]) -> List[str]:
+        """Map document IDs to the IDs their vectors are stored under"""
+        if not doc_ids:
+            return []
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(doc_ids))
+        cursor.execute(f'''
+            SELECT id, COALESCE(source_doc_id, id) AS vector_doc_id
+            FROM documents WHERE id IN ({placeholders})
+        ''', doc_ids)
+        mapping = {row['id']: row['vector_doc_id'] for row in cursor.fetchall()}
+        conn.close()
+        return list(dict.fromkeys(mapping.get(doc_id, doc_id) for doc_id in doc_ids))
+    
+    def count_vector_references(self, vector_doc_id: str) -> int:
+        """Count documents whose chunks are stored under the given vector document ID"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM documents
+            WHERE COALESCE(source_doc_id, id) = ?
+        ''', (vector_doc_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def add_chunk_references(self, doc_id: str, references: List[Dict]):
+        """Record chunks of doc_id that are stored once under another vector"""
+        if not references:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO chunk_references (doc_id, chunk_index, vector_id, chunk_hash, start_char, end_char)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (doc_id, ref['chunk_index'], ref['vector_id'], ref['chunk_hash'], ref.get('start_char'), ref.get('end_char'))
+            for ref in references
+        ])
+        conn.commit()
+        conn.close()
+    
+    def get_chunk_references(self, doc_ids: List[str]) -> List[Dict]:
+        """Shared chunks of the given vector document IDs, in document order"""
+        if not doc_ids:
+            return []
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(doc_ids))
+        cursor.execute(f'''
+            SELECT * FROM chunk_references WHERE doc_id IN ({placeholders})
+            ORDER BY doc_id, chunk_index
+        ''', doc_ids)
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def register_document_chunks(self, chunks: List[tuple]):
+        """Record (vector_id, doc_id, chunk_index) of stored vectors, replacing their previous owner or position"""
+        if not chunks:
+            return
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO document_chunks (vector_id, doc_id, chunk_index)
+            VALUES (?, ?, ?)
+        ''', chunks)
+        conn.commit()
+        conn.close()
+    
+    def unregister_document_chunks(self, vector_ids: List[str]):
+        """Forget deleted vectors"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('DELETE FROM document_chunks WHERE vector_id = ?', [(vector_id,) for vector_id in vector_ids])
+        conn.commit()
+        conn.close()
+    
+    def count_document_chunks(self, doc_id: str) -> int:
+        """Number of vectors registered to a document"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM document_chunks WHERE doc_id = ?', (doc_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_owned_vector_ids(self, doc_id: str) -> List[str]:
+        """IDs of the vectors a document owns"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT vector_id FROM document_chunks WHERE doc_id = ?', (doc_id,))
+        vector_ids = [row['vector_id'] for row in cursor.fetchall()]
+        conn.close()
+        return vector_ids
+    
+    def get_document_chunk_ids(self, doc_id: str, limit: int, offset: int = 0) -> List[Dict]:
+        """A page of a document's chunks in order, owned and shared, as chunk_index and vector_id"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT chunk_index, vector_id FROM document_chunks WHERE doc_id = ?
+            UNION ALL
+            SELECT chunk_index, vector_id FROM chunk_references WHERE doc_id = ?
+            ORDER BY chunk_index
+            LIMIT ? OFFSET ?
+        ''', (doc_id, doc_id, limit, offset))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def get_document_labels(self, doc_ids: List[str]) -> Dict[str, Dict]:
+        """Filename, course, uploader name, version and status of documents, keyed by ID"""
+        if not doc_ids:
+            return {}
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(doc_ids))
+        cursor.execute(f'''
+            SELECT d.id, d.filename, d.course_name, COALESCE(d.version, 1) AS version, u.username AS uploaded_by,
+                   d.status, d.revision_path IS NOT NULL AS revising
+            FROM documents d
+            LEFT JOIN users u ON u.id = d.uploaded_by
+            WHERE d.id IN ({placeholders})
+        ''', doc_ids)
+        labels = {row['id']: dict(row) for row in cursor.fetchall()}
+        conn.close()
+        return labels
+    
+    def get_chunk_referrers(self, vector_ids: List[str]) -> Dict[str, Dict]:
+        """For each shared vector, the earliest reference to it"""
+        referrers = {}
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        for start in range(0, len(vector_ids), 500):
+            batch = vector_ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT * FROM chunk_references
+                WHERE vector_id IN ({placeholders})
+                ORDER BY rowid
+            ''', batch)
+            for row in cursor.fetchall():
+                referrers.setdefault(row['vector_id'], dict(row))
+        conn.close()
+        return referrers
+    
+    def count_chunk_references(self, doc_id: str) -> int:
+        """Number of chunks of a document stored under another document's vectors"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM chunk_references WHERE doc_id = ?', (doc_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def delete_chunk_references(self, doc_id: str):
+        """Drop every shared-chunk reference of a document"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM chunk_references WHERE doc_id = ?', (doc_id,))
+        conn.commit()
+        conn.close()
+    
+    def drop_chunk_references(self, keys: List[tuple]):
+        """Drop single references by (doc_id, chunk_index), e.g. once their document owns the vector"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('DELETE FROM chunk_references WHERE doc_id = ? AND chunk_index = ?', keys)
+        conn.commit()
+        conn.close()
+    
+    def get_documents_by_source(self, source_doc_id: str) -> List[Dict]:
+        """Get documents that reuse the vectors of another document"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM documents WHERE source_doc_id = ? ORDER BY created_at ASC', (source_doc_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def reassign_vector_source(self, old_source_id: str, new_source_id: str):
+        """Point documents sharing old_source_id's vectors at new_source_id, which now owns or references them"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE documents SET source_doc_id = NULL WHERE id = ?', (new_source_id,))
+        cursor.execute('''
+            UPDATE documents SET source_doc_id = ?
+            WHERE source_doc_id = ? AND id != ?
+        ''', (new_source_id, old_source_id, new_source_id))
+        conn.commit()
+        conn.close()
+    
+    def queue_document_revision(self, doc_id: str, revision_path: str, revision_hash: str = None):
+        """Queue a revised file for incremental re-ingestion of an existing document"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE documents
+            SET revision_path = ?, revision_hash = ?, status = 'queued', error_message = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (revision_path, revision_hash, doc_id))
+        conn.commit()
+        conn.close()
+    
+    def finish_document_revision(self, doc_id: str, chunks_created: int = None, error_message: str = None):
+        """Close a revision: adopt the new file on success, keep the previous one on failure"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        if error_message is None:
+            cursor.execute('''
+                UPDATE documents
+                SET file_path = revision_path, revision_path = NULL, revision_hash = NULL, status = 'completed',
+                    version = COALESCE(version, 1) + 1, chunks_created = ?, error_message = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (chunks_created, doc_id))
+        else:
+            # The previous revision is still fully indexed
+            cursor.execute('''
+                UPDATE documents
+                SET revision_path = NULL, revision_hash = NULL, status = 'completed',
+                    error_message = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (f"Update failed: {error_message}", doc_id))
+        conn.commit()
+        conn.close()
+    
     def get_documents_by_user(self, user_id: str) -> List[Dict]:
         """Get all documents uploaded by user"""
         conn = self.get_connection()
@@ -250,13 +762,19 @@ class Database:
         conn.close()
         return [dict(row) for row in rows]
     
-    def delete_document(self, doc_id: str):
-        """Delete document record"""
+    def delete_document(self, doc_id: str) -> List[str]:
+        """Delete document record, its shared-chunk references and chunk registrations; returns the IDs of the vectors it owned"""
         conn = self.get_connection()  # ← FIXED (was self.get_.get_connection())
         cursor = conn.cursor()
+        cursor.execute('SELECT vector_id FROM document_chunks WHERE doc_id = ?', (doc_id,))
+        owned = [row['vector_id'] for row in cursor.fetchall()]
         cursor.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+        cursor.execute('DELETE FROM ingestion_journal WHERE doc_id = ?', (doc_id,))
+        cursor.execute('DELETE FROM chunk_references WHERE doc_id = ?', (doc_id,))
+        cursor.execute('DELETE FROM document_chunks WHERE doc_id = ?', (doc_id,))
         conn.commit()
         conn.close()
+        return owned
     
     def count_documents(self) -> int:
         """Count total documents"""
@@ -0,0 +1,109 @@
+"""
+Document Directory
+Resolves the document key stored on each chunk to its filename, course,
+uploader, version and status, with a small time-limited cache in front of SQLite
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from services.database import Database
+
+
+class DocumentDirectory:
+    """
+    Cached join of chunk document keys against the documents table. Entries
+    expire after `ttl_seconds` so revisions and deletions show up without
+    explicit invalidation; at most `max_entries` documents are kept.
+    """
+
+    def __init__(self, db: Database, ttl_seconds: float = 60, max_entries: int = 4096):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # doc_id -> (expires_at, label or None)
+        self._lock = threading.Lock()
+
+    def resolve(self, doc_ids: List[str]) -> Dict[str, Dict]:
+        """Labels of the known documents among doc_ids, one query for all cache misses"""
+        now = time.monotonic()
+        labels, missing = {}, []
+        with self._lock:
+            for doc_id in dict.fromkeys(doc_ids):
+                entry = self._entries.get(doc_id)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(doc_id)
+                    if entry[1]:
+                        labels[doc_id] = entry[1]
+                else:
+                    missing.append(doc_id)
+
+        if missing:
+            fetched = self.db.get_document_labels(missing)
+            with self._lock:
+                for doc_id in missing:
+                    label = fetched.get(doc_id)
+                    if label and not _settled(label):
+                        # Documents being ingested are looked up again until they are done
+                        continue
+                    # Unknown documents are cached too, so deleted ones are not queried on every answer
+                    self._entries[doc_id] = (now + self.ttl_seconds, label)
+                    self._entries.move_to_end(doc_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            labels.update(fetched)
+        return labels
+
+    def visible(self, metadatas: List[Dict]) -> List[bool]:
+        """
+        Whether each chunk may be retrieved. A document's chunks appear together
+        once it is completed; chunks a revision adds (stamped with the version
+        they belong to) appear once the revision is, and the chunks it retires
+        disappear at the same time. Chunks of deleted documents are hidden.
+        """
+        doc_ids = [metadata.get("doc_id") for metadata in metadatas]
+        labels = self.resolve([doc_id for doc_id in doc_ids if doc_id])
+        # A chunk newer than the cached version means a revision finished since
+        stale = {
+            doc_id for doc_id, metadata in zip(doc_ids, metadatas)
+            if doc_id in labels and metadata.get("version", 1) > labels[doc_id]['version']
+        }
+        if stale:
+            for doc_id in stale:
+                self.invalidate(doc_id)
+            labels.update(self.resolve(list(stale)))
+        return [
+            chunk_visible(labels.get(doc_id), metadata)
+            for doc_id, metadata in zip(doc_ids, metadatas)
+        ]
+
+    def invalidate(self, doc_id: str = None):
+        with self._lock:
+            if doc_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(doc_id, None)
+
+
+def format_source(label: Dict) -> str:
+    """'notes.pdf (Data Mining, v2)' style display name"""
+    details = [part for part in (label.get('course_name'), f"v{label['version']}" if label.get('version', 1) > 1 else None) if part]
+    return f"{label['filename']} ({', '.join(details)})" if details else label['filename']
+
+
+def _settled(label: Dict) -> bool:
+    """Documents whose visibility cannot change until they are revised or deleted"""
+    return label.get('status') in ('completed', 'failed') and not label.get('revising')
+
+
+def chunk_visible(label: Optional[Dict], metadata: Dict) -> bool:
+    """Whether a chunk with this metadata is retrievable, given its owning document's label"""
+    if label is None:
+        return False
+    if label.get('status') != 'completed' and not label.get('revising'):
+        return False
+    retired_in = metadata.get("retired")
+    if retired_in and label['version'] >= retired_in:
+        return False
+    return metadata.get("version", 1) <= label['version']
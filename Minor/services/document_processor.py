@@ -1,68 +1,608 @@
 """
 Document Processor Service
-Handles PDF extraction, text chunking, embedding, and storage.
+Handles PDF and document text extraction, text chunking, embedding, and storage.
 """
 
 import os
-from typing import Dict, Any, List
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import itertools
+import logging
+import threading
+import uuid
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from langchain_chroma import Chroma
-from pypdf import PdfReader
-from config import CHROMA_DB_DIR
+from config import CHROMA_DB_DIR, INGESTION_BATCH_SIZE, BULK_INGESTION_BATCH_SIZE, STRIP_BOILERPLATE
+from services.chunk_store import find_stored_chunks, release_document, release_vectors
+from services.chunking import Chunk, create_chunker
+from services.database import Database
+from services.embedding_service import get_embeddings
+from services.ocr import iter_pages_with_ocr, ocr_available
+from services.page_cache import PageCache
+from services.progress import ProgressTracker
+from services.text_cleaning import BoilerplateFilter
+from services.extractors import engine_for, get_extractor
+from services.text_extraction import iter_document_pages
+from services.vector_writer import VectorStoreWriter
+from utils.hashing import file_sha256, chunk_hash
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionCancelled(Exception):
+    """The documents were deleted while being ingested; their vectors have been released"""
+
+    def __init__(self, doc_ids: List[str]):
+        super().__init__(f"Deleted during ingestion: {', '.join(doc_ids)}")
+        self.doc_ids = doc_ids
+
 
 class DocumentProcessor:
-    def __init__(self):
-        # Define embeddings model (you can replace with OpenAIEmbeddings or others)
-        self.embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    def __init__(self, db: Optional[Database] = None, progress: Optional[ProgressTracker] = None):
+        # Shared with RAGEngine so documents and queries are embedded identically
+        self.embedding_model = get_embeddings()
         self.vectorstore_path = CHROMA_DB_DIR # Updated path to match config.py
+        self.db = db  # Used to reuse vectors of byte-identical uploads
+        self.chunker = create_chunker()
+        self.page_cache = PageCache()  # Re-chunking and re-indexing skip document parsing
+        self.progress = progress or ProgressTracker()  # Live pages/chunks/vectors counts for the UI
+        self._vectorstore: Optional[Chroma] = None
+        self._writer: Optional[VectorStoreWriter] = None  # Coalesces the upserts of all workers
+        self._vectorstore_lock = threading.Lock()
 
-    def process_pdf(self, file_path: str, doc_id: str, filename: str, uploaded_by: str) -> Dict[str, Any]:
-        """
-        Extract text from PDF, split into chunks, generate embeddings, and store in Chroma.
-        """
-        # Step 1: Extract text
-        text = self._extract_text_from_pdf(file_path)
-        if not text.strip():
-            raise ValueError("No readable text found in PDF")
-
-        # Step 2: Split into chunks
-        chunks = self._split_into_chunks(text)
-        if not chunks:
-            raise ValueError("Failed to split document into chunks")
-
-        # Step 3: Generate embeddings and store in Chroma
-        metadatas = [{"doc_id": doc_id, "filename": filename, "uploaded_by": uploaded_by}] * len(chunks)
-        vectorstore = Chroma.from_texts(
-            texts=chunks,
-            embedding=self.embedding_model,
-            metadatas=metadatas,
-            persist_directory=self.vectorstore_path,
-            collection_name="faculty_documents" # Use doc_id as collection name for isolation
-        )
+    def process_pdf(self, file_path: str, doc_id: str, filename: str, uploaded_by: str,
+                    content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract text from a PDF (or DOCX, PPTX, text or HTML document), split into
+        chunks, generate embeddings, and store in Chroma.
+        If the same content is already indexed, its chunks are reused instead.
+        An attempt interrupted by a restart resumes after its last stored batch.
+        Pass the content_hash computed at upload to avoid reading the file twice.
+        """
+        self.progress.start(doc_id, filename, uploaded_by)
+        # Step 0: Reuse an identical upload that has already been indexed
+        content_hash = content_hash or file_sha256(file_path)
+        reused = self._reuse_identical(doc_id, filename, content_hash)
+        if reused:
+            self.progress.update(doc_id, stage="stored")
+            return reused
+
+        # Steps 1-3 stream through bounded batches: pages are extracted in the
+        # background pool, chunked as they arrive, then embedded and stored
+        vectorstore = self._open_vectorstore()
+        cleaner = BoilerplateFilter()
+        chunks = self._iter_tracked_chunks(doc_id, file_path, content_hash, cleaner)
+        try:
+            chunks_created = self._resume(vectorstore, doc_id, content_hash, chunks)
+            if chunks_created is None:
+                # The stored chunks no longer match (settings changed), start over
+                self.progress.start(doc_id, filename, uploaded_by)
+                cleaner = BoilerplateFilter()
+                chunks = self._iter_tracked_chunks(doc_id, file_path, content_hash, cleaner)
+                chunks_created = 0
+            elif chunks_created:
+                self.progress.update(doc_id, chunks_embedded=chunks_created, vectors_written=chunks_created)
+            self._checkpoint(doc_id, "extracting", content_hash=content_hash)
+            for batch in _batched(chunks, INGESTION_BATCH_SIZE):
+                self._store_batch(vectorstore, batch, chunks_created, doc_id)
+                chunks_created += len(batch)
+                self._checkpoint(doc_id, "embedding", chunks_stored=chunks_created,
+                                 last_chunk_hash=chunk_hash(batch[-1].text))
+            if chunks_created == 0:
+                raise ValueError(_no_text_message(file_path))
+        except Exception:
+            # Never leave a half-indexed document behind
+            self._delete_vectors(vectorstore, doc_id)
+            self.progress.update(doc_id, stage="failed")
+            raise
+
+        if self.db:
+            self.db.set_document_content(doc_id, content_hash)
+        self._checkpoint(doc_id, "stored")
+        self.progress.update(doc_id, stage="stored")
         
         # Return summary info
         return {
             "document_id": doc_id,
             "filename": filename,
-            "chunks_created": len(chunks),
+            "chunks_created": chunks_created,
+            "chunks_shared": self.db.count_chunk_references(doc_id) if self.db else 0,
+            "boilerplate_chars_removed": cleaner.characters_removed,
+            "stored_path": self.vectorstore_path
+        }
+
+    def _checkpoint(self, doc_id: str, stage: str, **progress):
+        """Record progress in the ingestion journal so an interrupted attempt can resume."""
+        if self.db:
+            self.db.record_ingestion_progress(doc_id, stage, **progress)
+
+    def _checkpoint_pending(self, pending: List[tuple]):
+        """Checkpoint the last stored chunk of every document in a written batch."""
+        last = {}
+        for _, _, metadata in pending:
+            last[metadata["doc_id"]] = metadata
+        for doc_id, metadata in last.items():
+            self._checkpoint(doc_id, "embedding", chunks_stored=metadata["chunk_index"] + 1,
+                             last_chunk_hash=metadata["chunk_hash"])
+
+    def _resume(self, vectorstore: Chroma, doc_id: str, content_hash: str,
+                chunks: Iterator[Chunk]) -> Optional[int]:
+        """
+        Skips the chunks an interrupted attempt already stored and returns how
+        many there were (0 on a first attempt). Returns None, after removing the
+        partial vectors, if the chunk stream no longer lines up with them.
+        """
+        checkpoint = self.db.get_ingestion_checkpoint(doc_id) if self.db else None
+        if not checkpoint or checkpoint['attempts'] <= 1:
+            return 0
+        stored = checkpoint['chunks_stored'] or 0
+        if stored and checkpoint['content_hash'] == content_hash:
+            last = None
+            for last in itertools.islice(chunks, stored - 1, stored):
+                pass
+            if last is not None and chunk_hash(last.text) == checkpoint['last_chunk_hash']:
+                logger.info(f"Resuming document {doc_id} after {stored} stored chunks")
+                return stored
+        # Anything a previous attempt left behind is unusable
+        self._delete_vectors(vectorstore, doc_id)
+        self.db.reset_ingestion_checkpoint(doc_id)
+        return None if stored else 0
+
+    def discard_vectors(self, doc_id: str):
+        """Remove the chunks of a document whose ingestion was abandoned."""
+        self._delete_vectors(self._open_vectorstore(), doc_id)
+
+    def _open_vectorstore(self) -> Chroma:
+        """Open the shared faculty documents collection once, workers reuse the handle."""
+        # Creating Chroma clients concurrently from several worker threads is not safe
+        with self._vectorstore_lock:
+            if self._vectorstore is None:
+                self._vectorstore = Chroma(
+                    collection_name="faculty_documents",
+                    embedding_function=self.embedding_model,
+                    persist_directory=self.vectorstore_path
+                )
+                self._writer = VectorStoreWriter(self._vectorstore._collection)
+            return self._vectorstore
+
+    def process_batch(self, documents: List[Dict[str, Any]]) -> Iterator[Tuple[str, Any]]:
+        """
+        Ingest several PDFs as one job. Chunks from consecutive files share
+        BULK_INGESTION_BATCH_SIZE embedding batches, so small files no longer pay
+        for a model call each. Yields (doc_id, result) as every document becomes
+        fully stored, or (doc_id, exception) when it fails; a failure only
+        affects its own document.
+        """
+        vectorstore = self._open_vectorstore()
+        pending = []        # (id, text, metadata) across documents
+        unflushed = {}      # doc_id -> result waiting for its last chunks to be stored
+        batch_sources = {}  # content hash -> (doc_id, chunks) indexed earlier in this batch
+        cancelled = set()   # documents deleted while this job ran
+
+        def flush():
+            try:
+                self._store_pending(vectorstore, pending)
+            except IngestionCancelled as e:
+                cancelled.update(e.doc_ids)
+            self._checkpoint_pending([entry for entry in pending if entry[2]["doc_id"] not in cancelled])
+            written = [(doc_id, result) for doc_id, result in unflushed.items() if doc_id not in cancelled]
+            lost = [doc_id for doc_id in unflushed if doc_id in cancelled]
+            pending.clear()
+            unflushed.clear()
+            for doc_id in lost:
+                self.progress.update(doc_id, stage="failed")
+                yield doc_id, IngestionCancelled([doc_id])
+            yield from self._finish_documents(written)
+
+        for doc in documents:
+            doc_id, filename, uploaded_by = doc['doc_id'], doc['filename'], doc['uploaded_by']
+            self.progress.start(doc_id, filename, uploaded_by)
+            try:
+                content_hash = doc.get('content_hash') or file_sha256(doc['file_path'])
+                if content_hash in batch_sources:
+                    source_doc_id, chunks_created = batch_sources[content_hash]
+                    copy = {
+                        "document_id": doc_id,
+                        "filename": filename,
+                        "chunks_created": chunks_created,
+                        "content_hash": content_hash,
+                        "stored_path": self.vectorstore_path,
+                        "deduplicated_from": source_doc_id
+                    }
+                    # Finish together with the document whose chunks it reuses
+                    if source_doc_id in unflushed:
+                        unflushed[doc_id] = copy
+                    else:
+                        yield from self._finish_documents([(doc_id, copy)])
+                    continue
+
+                reused = self._reuse_identical(doc_id, filename, content_hash)
+                if reused:
+                    self.progress.update(doc_id, stage="stored")
+                    yield doc_id, reused
+                    continue
+
+                chunks_created = 0
+                self._checkpoint(doc_id, "extracting", content_hash=content_hash)
+                cleaner = BoilerplateFilter()
+                for chunk in self._iter_tracked_chunks(doc_id, doc['file_path'], content_hash, cleaner):
+                    pending.append((
+                        f"{doc_id}:{chunks_created}", chunk.text,
+                        self._chunk_metadata(doc_id, chunks_created, chunk)
+                    ))
+                    chunks_created += 1
+                    if len(pending) >= BULK_INGESTION_BATCH_SIZE:
+                        yield from flush()
+                        if doc_id in cancelled:
+                            raise IngestionCancelled([doc_id])
+                if chunks_created == 0:
+                    raise ValueError(_no_text_message(doc['file_path']))
+            except Exception as e:
+                pending[:] = [entry for entry in pending if entry[2]["doc_id"] != doc_id]
+                self._delete_vectors(vectorstore, doc_id)
+                self.progress.update(doc_id, stage="failed")
+                yield doc_id, e
+                continue
+
+            batch_sources[content_hash] = (doc_id, chunks_created)
+            unflushed[doc_id] = {
+                "document_id": doc_id,
+                "filename": filename,
+                "chunks_created": chunks_created,
+                "boilerplate_chars_removed": cleaner.characters_removed,
+                "content_hash": content_hash,
+                "stored_path": self.vectorstore_path
+            }
+
+        try:
+            yield from flush()
+        except Exception as e:
+            for doc_id in list(unflushed):
+                self._delete_vectors(vectorstore, doc_id)
+                self.progress.update(doc_id, stage="failed")
+                yield doc_id, e
+
+    def _finish_documents(self, written: List[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Any]]:
+        """Records content hashes of documents whose chunks are all stored."""
+        for doc_id, result in written:
+            if self.db:
+                self.db.set_document_content(doc_id, result["content_hash"], result.get("deduplicated_from"))
+                if not result.get("deduplicated_from"):
+                    result["chunks_shared"] = self.db.count_chunk_references(doc_id)
+            self._checkpoint(doc_id, "stored")
+            self.progress.update(doc_id, stage="stored")
+            yield doc_id, result
+
+    def _reuse_identical(self, doc_id: str, filename: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Points doc_id at the chunks of an already indexed identical upload, if any."""
+        if not self.db:
+            return None
+        existing = self.db.get_document_by_hash(content_hash, exclude_id=doc_id)
+        if not existing:
+            return None
+        source_doc_id = existing['source_doc_id'] or existing['id']
+        self.db.set_document_content(doc_id, content_hash, source_doc_id=source_doc_id)
+        return {
+            "document_id": doc_id,
+            "filename": filename,
+            "chunks_created": existing['chunks_created'] or 0,
+            "stored_path": self.vectorstore_path,
+            "deduplicated_from": source_doc_id
+        }
+
+    def update_pdf(self, file_path: str, doc_id: str, filename: str, uploaded_by: str,
+                   content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Re-ingest a revised version of an already indexed PDF under the same doc_id.
+        The new chunks are diffed against the stored ones by content hash: only
+        new chunks are embedded, removed chunks are retired and unchanged chunks
+        keep their vectors (their position is updated if it moved).
+        Retrieval keeps serving the previous revision until the document is
+        marked complete; call release_retired then to delete the removed chunks.
+        """
+        self.progress.start(doc_id, filename, uploaded_by)
+        vectorstore = self._open_vectorstore()
+        # Left behind by a revision interrupted before it was completed
+        self.release_retired(doc_id)
+        content_hash = content_hash or file_sha256(file_path)
+        previous_references = []
+        document = self.db.get_document(doc_id) if self.db else None
+        # New chunks stay hidden from retrieval until the revision is complete
+        version = (document['version'] or 1) if document else 1
+        if self.db:
+            self._prepare_revision(vectorstore, doc_id, content_hash)
+            # Shared chunks are looked up again as the new text is stored
+            previous_references = self.db.get_chunk_references([doc_id])
+            self.db.delete_chunk_references(doc_id)
+
+        # chunk_hash -> ids of stored chunks with that content
+        stored = self._stored_chunk_hashes(vectorstore, doc_id)
+
+        added_ids = []
+        moved_ids, moved_metadatas = [], []
+        pending = []  # (id, text, metadata) waiting to be embedded
+        chunk_index = 0
+        cleaner = BoilerplateFilter()
+        try:
+            for chunk in self._iter_tracked_chunks(doc_id, file_path, content_hash, cleaner):
+                metadata = self._chunk_metadata(doc_id, chunk_index, chunk, version + 1)
+                matches = stored.get(metadata["chunk_hash"])
+                if matches:
+                    moved_ids.append(matches.pop())
+                    moved_metadatas.append(self._chunk_metadata(doc_id, chunk_index, chunk, version))
+                else:
+                    pending.append((f"{doc_id}:{uuid.uuid4().hex}", chunk.text, metadata))
+                    if len(pending) >= INGESTION_BATCH_SIZE:
+                        added_ids.extend(self._store_pending(vectorstore, pending))
+                        pending = []
+                chunk_index += 1
+            added_ids.extend(self._store_pending(vectorstore, pending))
+
+            if chunk_index == 0:
+                raise ValueError(_no_text_message(file_path))
+        except IngestionCancelled:
+            # Deleted meanwhile, nothing to roll back to
+            self.progress.update(doc_id, stage="failed")
+            raise
+        except Exception:
+            # Roll back to the previous revision
+            if added_ids:
+                release_vectors(vectorstore._collection, self.db, added_ids)
+            if self.db:
+                self.db.delete_chunk_references(doc_id)
+                self.db.add_chunk_references(doc_id, previous_references)
+            self.progress.update(doc_id, stage="failed")
+            raise
+
+        # Unchanged chunks only get their metadata rewritten, no embedding
+        for start in range(0, len(moved_ids), INGESTION_BATCH_SIZE):
+            vectorstore._collection.update(
+                ids=moved_ids[start:start + INGESTION_BATCH_SIZE],
+                metadatas=moved_metadatas[start:start + INGESTION_BATCH_SIZE]
+            )
+            self.progress.advance(doc_id, vectors_written=len(moved_ids[start:start + INGESTION_BATCH_SIZE]))
+        if self.db:
+            self.db.register_document_chunks([
+                (vector_id, doc_id, metadata["chunk_index"]) for vector_id, metadata in zip(moved_ids, moved_metadatas)
+            ])
+        removed_ids = [chunk_id for ids in stored.values() for chunk_id in ids]
+        # Removed chunks disappear from retrieval together with the new ones appearing
+        for start in range(0, len(removed_ids), INGESTION_BATCH_SIZE):
+            batch = removed_ids[start:start + INGESTION_BATCH_SIZE]
+            vectorstore._collection.update(ids=batch, metadatas=[{"retired": version + 1}] * len(batch))
+
+        if self.db:
+            self.db.set_document_content(doc_id, content_hash)
+            if document and document['content_hash'] != content_hash:
+                self.release_pages(document['content_hash'])
+        self.progress.update(doc_id, stage="stored")
+
+        return {
+            "document_id": doc_id,
+            "filename": filename,
+            "chunks_created": chunk_index,
+            "chunks_added": len(added_ids),
+            "chunks_removed": len(removed_ids),
+            "chunks_unchanged": len(moved_ids),
+            "chunks_shared": self.db.count_chunk_references(doc_id) if self.db else 0,
+            "boilerplate_chars_removed": cleaner.characters_removed,
             "stored_path": self.vectorstore_path
         }
 
-    def _extract_text_from_pdf(self, file_path: str) -> str:
-        """Extracts text content from each page of the PDF."""
-        text = ""
-        with open(file_path, "rb") as f:
-            pdf = PdfReader(f)
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text
-
-    def _split_into_chunks(self, text: str) -> List[str]:
-        """Splits text into manageable chunks for embedding."""
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
-        return splitter.split_text(text)
+    def release_pages(self, content_hash: Optional[str]):
+        """Drop the cached pages of content no document uses any more"""
+        if content_hash and not (self.db and self.db.content_in_use(content_hash)):
+            self.page_cache.discard(content_hash)
+
+    def release_retired(self, doc_id: str):
+        """Delete the chunks a completed revision removed, handing over those other documents still reference"""
+        collection = self._open_vectorstore()._collection
+        retired = collection.get(where={"$and": [{"doc_id": doc_id}, {"retired": {"$gt": 0}}]}, include=[])
+        release_vectors(collection, self.db, retired['ids'])
+
+    def _prepare_revision(self, vectorstore: Chroma, doc_id: str, content_hash: str):
+        """
+        Make sure doc_id owns the vectors the update will modify. A document that
+        reuses another upload's chunks starts from an empty set. Identical
+        uploads that reuse this document's chunks keep the current text: the
+        first one records a reference to each of its chunks instead, so the
+        vectors it still needs are handed over to it once the revision retires
+        them. A re-index keeps the text, so they simply follow the new chunks.
+        """
+        doc = self.db.get_document(doc_id)
+        if doc and doc['source_doc_id']:
+            self.db.set_document_content(doc_id, doc['content_hash'])
+            return
+        if doc and doc['content_hash'] == content_hash:
+            return
+
+        sharing = [d['id'] for d in self.db.get_documents_by_source(doc_id)]
+        if not sharing:
+            return
+        new_owner = sharing[0]
+        existing = vectorstore._collection.get(where={"doc_id": doc_id}, include=["metadatas", "documents"])
+        self.db.add_chunk_references(new_owner, [
+            {
+                "vector_id": vector_id,
+                "chunk_index": metadata.get("chunk_index", 0),
+                "chunk_hash": metadata.get("chunk_hash") or chunk_hash(text),
+                "start_char": metadata.get("start_char"),
+                "end_char": metadata.get("end_char")
+            }
+            for vector_id, metadata, text in zip(existing['ids'], existing['metadatas'], existing['documents'])
+        ] + self.db.get_chunk_references([doc_id]))
+        self.db.reassign_vector_source(doc_id, new_owner)
+
+    def _stored_chunk_hashes(self, vectorstore: Chroma, doc_id: str) -> Dict[str, List[str]]:
+        """Maps chunk content hash to the ids of the chunks stored for a document."""
+        stored = vectorstore._collection.get(where={"doc_id": doc_id}, include=["metadatas"])
+        hashes: Dict[str, List[str]] = {}
+        missing = []
+        for chunk_id, metadata in zip(stored['ids'], stored['metadatas']):
+            if metadata and metadata.get("chunk_hash"):
+                hashes.setdefault(metadata["chunk_hash"], []).append(chunk_id)
+            else:
+                missing.append(chunk_id)
+
+        # Chunks indexed before hashes were recorded are hashed from their text
+        for start in range(0, len(missing), INGESTION_BATCH_SIZE):
+            legacy = vectorstore._collection.get(ids=missing[start:start + INGESTION_BATCH_SIZE], include=["documents"])
+            for chunk_id, text in zip(legacy['ids'], legacy['documents']):
+                hashes.setdefault(chunk_hash(text), []).append(chunk_id)
+        return hashes
+
+    def _chunk_metadata(self, doc_id: str, chunk_index: int, chunk: Chunk, version: int = 1) -> Dict[str, Any]:
+        """
+        Metadata stored with every chunk. Only the document key is stored;
+        filename, course, uploader and version are looked up in the documents
+        table (see DocumentDirectory) so they are not repeated on every chunk.
+        Chunks added by a revision record the document version they belong to.
+        """
+        metadata = {
+            "doc_id": doc_id,
+            "chunk_index": chunk_index,
+            "chunk_hash": chunk_hash(chunk.text),
+            "start_char": chunk.start_char,
+            "end_char": chunk.end_char
+        }
+        if version > 1:
+            metadata["version"] = version
+        return metadata
+
+    def _store_batch(self, vectorstore: Chroma, chunks: List[Chunk], first_index: int, doc_id: str):
+        """Embeds one batch of chunks and writes it to the vector store."""
+        self._store_pending(vectorstore, [
+            (f"{doc_id}:{first_index + i}", chunk.text, self._chunk_metadata(doc_id, first_index + i, chunk))
+            for i, chunk in enumerate(chunks)
+        ])
+
+    def _store_pending(self, vectorstore: Chroma, pending: List[tuple]) -> List[str]:
+        """
+        Embeds (id, text, metadata) entries and writes them, returns the ids written.
+        Chunks whose content is already stored, by any document or earlier in
+        this batch, are recorded as references to that vector instead.
+        """
+        if not pending:
+            return []
+        to_write, references = pending, {}
+        if self.db:
+            stored = find_stored_chunks(vectorstore._collection, self.db,
+                                        list({metadata["chunk_hash"] for _, _, metadata in pending}))
+            to_write = []
+            for entry in pending:
+                chunk_id, _, metadata = entry
+                vector_id = stored.setdefault(metadata["chunk_hash"], chunk_id)
+                if vector_id == chunk_id:
+                    to_write.append(entry)
+                else:
+                    references.setdefault(metadata["doc_id"], []).append({**metadata, "vector_id": vector_id})
+
+        ids = []
+        if to_write:
+            ids, chunks, metadatas = (list(column) for column in zip(*to_write))
+            embeddings = self.embedding_model.embed_documents(chunks)
+            for doc_id, count in Counter(metadata["doc_id"] for metadata in metadatas).items():
+                self.progress.advance(doc_id, chunks_embedded=count)
+            self._writer.upsert(ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
+            if self.db:
+                self.db.register_document_chunks([
+                    (vector_id, metadata["doc_id"], metadata["chunk_index"])
+                    for vector_id, metadata in zip(ids, metadatas)
+                ])
+        for doc_id, doc_references in references.items():
+            self.db.add_chunk_references(doc_id, doc_references)
+        for doc_id, count in Counter(metadata["doc_id"] for _, _, metadata in pending).items():
+            self.progress.advance(doc_id, vectors_written=count)
+
+        # A document deleted while its batch was in flight would leave orphaned
+        # vectors: deletion removes the row first, so checking after the write
+        # catches every batch the deleting side's cleanup may have missed
+        deleted = [doc_id for doc_id in dict.fromkeys(metadata["doc_id"] for _, _, metadata in pending)
+                   if self.db and self.db.get_document(doc_id) is None]
+        if deleted:
+            for doc_id in deleted:
+                self._delete_vectors(vectorstore, doc_id)
+            raise IngestionCancelled(deleted)
+        return ids
+
+    def _delete_vectors(self, vectorstore: Chroma, doc_id: str):
+        """Removes every chunk stored for a document, keeping those other documents share."""
+        try:
+            release_document(vectorstore._collection, self.db, doc_id)
+        except Exception as e:
+            logger.error(f"Failed to clean up vectors for {doc_id}: {str(e)}")
+
+    def _iter_document_pages(self, file_path: str, content_hash: Optional[str] = None,
+                             doc_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the text of each page (slide or section for non-PDF formats) in
+        order. Pages already extracted for this content are read from the page
+        cache; otherwise they are parsed in parallel and cached on the way
+        through. Text-less (scanned) PDF pages are OCRed when OCR is available.
+        """
+        def on_page_count(count: int):
+            self.progress.update(doc_id, pages_total=count)
+
+        engine = engine_for(file_path)
+        pages = iter_document_pages(file_path, on_page_count=on_page_count if doc_id else None)
+        ocr_failures = []
+        if get_extractor(engine).paginated:
+            pages = iter_pages_with_ocr(file_path, pages, on_fallback=ocr_failures.append)
+            engine = f"{engine}{'+ocr' if ocr_available() else ''}"
+        if content_hash is None:
+            return pages
+        # Engines extract different text, so each has its own cache entries
+        cache_key = f"{engine}:{content_hash}"
+        cached_pages = self.page_cache.page_count(cache_key)
+        if cached_pages is not None:
+            if doc_id:
+                on_page_count(cached_pages)
+            return self.page_cache.iter_pages(cache_key)
+        # Pages whose OCR failed are not cached, so the next re-index tries again
+        return self.page_cache.cache_pages(cache_key, pages, is_complete=lambda: not ocr_failures)
+
+    def _iter_clean_pages(self, file_path: str, content_hash: Optional[str],
+                          cleaner: BoilerplateFilter, doc_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Pages with running headers, footers and page numbers stripped. The page
+        cache keeps the raw text, so cleaning can change without re-extracting.
+        """
+        pages = self._track_pages(doc_id, self._iter_document_pages(file_path, content_hash, doc_id))
+        # Only physical pages carry running headers; slides and sections do not
+        if not STRIP_BOILERPLATE or not get_extractor(engine_for(file_path)).paginated:
+            return pages
+        return cleaner.strip(pages)
+
+    def _track_pages(self, doc_id: Optional[str], pages: Iterable[str]) -> Iterator[str]:
+        """Passes pages through, publishing how many have been extracted."""
+        for page in pages:
+            if doc_id:
+                self.progress.advance(doc_id, pages_extracted=1)
+            yield page
+
+    def _iter_tracked_chunks(self, doc_id: str, file_path: str, content_hash: str,
+                             cleaner: BoilerplateFilter) -> Iterator[Chunk]:
+        """Chunks of a document, publishing progress as pages and chunks are produced."""
+        pages = self._iter_clean_pages(file_path, content_hash, cleaner, doc_id)
+        for index, chunk in enumerate(self.chunker.iter_chunk_spans(pages)):
+            if index == 0:
+                # Batches are embedded while the rest of the document is still extracted
+                self.progress.update(doc_id, stage="embedding")
+            self.progress.advance(doc_id, chunks_created=1)
+            yield chunk
+        self.progress.update(doc_id, extraction_done=True)
+
+
+def _no_text_message(file_path: str) -> str:
+    """Error for documents that produced no chunks, hinting at OCR for scanned PDFs"""
+    if not file_path.lower().endswith(".pdf"):
+        return "No readable text found in document"
+    if ocr_available():
+        return "No readable text found in PDF"
+    return "No readable text found in PDF (scanned documents need OCR: install pymupdf, pytesseract and Tesseract)"
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Groups an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
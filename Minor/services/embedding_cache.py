@@ -0,0 +1,102 @@
+"""
+Embedding Cache Service
+Persistent chunk embedding cache with length-bucketed batching
+"""
+import sqlite3
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_BATCH_SIZE
+from utils.hashing import chunk_hash
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model with an on-disk cache keyed by
+    (model name, normalized chunk hash). Only texts that miss the cache reach
+    the model, sorted by length and batched so each batch pads little.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_path: str = EMBEDDING_CACHE_PATH, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.batch_size = max(1, batch_size)
+        self._initialize_cache()
+
+    def get_connection(self):
+        """Get cache connection"""
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _initialize_cache(self):
+        """Create the cache table"""
+        conn = self.get_connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, chunk_hash)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors and embedding only the misses"""
+        keys = [chunk_hash(text) for text in texts]
+        vectors = self._load(set(keys))
+
+        # One representative text per missing hash, shortest first
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        ordered = sorted(missing, key=lambda key: len(missing[key]))
+
+        for start in range(0, len(ordered), self.batch_size):
+            batch = ordered[start:start + self.batch_size]
+            embedded = self.embeddings.embed_documents([missing[key] for key in batch])
+            new_vectors = dict(zip(batch, embedded))
+            self._save(new_vectors)
+            vectors.update(new_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are one-off, embed them directly"""
+        return self.embeddings.embed_query(text)
+
+    def _load(self, keys: set) -> Dict[str, List[float]]:
+        """Fetch cached vectors for the given chunk hashes"""
+        if not keys:
+            return {}
+        found = {}
+        key_list = list(keys)
+        conn = self.get_connection()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(key_list), 500):
+            batch = key_list[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})',
+                [self.model_name, *batch]
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array('f', blob).tolist()
+        conn.close()
+        return found
+
+    def _save(self, vectors: Dict[str, List[float]]):
+        """Store freshly computed vectors"""
+        conn = self.get_connection()
+        conn.executemany(
+            'INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)',
+            [(self.model_name, key, array('f', vector).tobytes()) for key, vector in vectors.items()]
+        )
+        conn.commit()
+        conn.close()
@@ -0,0 +1,47 @@
+"""
+Embedding Service
+One process-wide embeddings model shared by ingestion and retrieval
+"""
+import logging
+import threading
+from typing import Any, Optional, Tuple
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from config import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_DEVICE
+from services.embedding_cache import CachedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+_embeddings: Optional[CachedEmbeddings] = None
+_lock = threading.Lock()
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Return the shared embeddings model, loading it on first use.
+    Documents and queries both go through this instance, so they are always
+    embedded with the same model and normalization.
+    """
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            logger.info(f"Loading embeddings model {EMBEDDING_MODEL} on {EMBEDDING_DEVICE}")
+            model = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL,
+                model_kwargs={'device': EMBEDDING_DEVICE},
+                encode_kwargs={'normalize_embeddings': True, 'batch_size': EMBEDDING_BATCH_SIZE}
+            )
+            # The cache key carries the normalization so older, unnormalized vectors are never reused
+            _embeddings = CachedEmbeddings(model, model_name=f"{EMBEDDING_MODEL}:normalized")
+        return _embeddings
+
+
+def get_tokenizer() -> Tuple[Any, int]:
+    """
+    Tokenizer of the shared model and the number of content tokens that fit
+    its window (the model truncates anything longer).
+    """
+    client = get_embeddings().embeddings._client
+    tokenizer = client.tokenizer
+    return tokenizer, client.max_seq_length - tokenizer.num_special_tokens_to_add()
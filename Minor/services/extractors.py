@@ -0,0 +1,307 @@
+"""
+Document Extractors
+Interchangeable PDF text extraction backends and native extractors for
+Office, plain text and HTML documents
+"""
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Type
+
+from config import PDF_EXTRACTOR
+
+
+class DocumentExtractor:
+    """Base class: extracts the text of a page range of a document"""
+
+    name = ""
+    paginated = True  # Pages are physical pages with running headers and footers
+
+    def page_count(self, file_path: str) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        """Text of pages [start, end), one string per page"""
+        raise NotImplementedError
+
+
+class PdfExtractor(DocumentExtractor):
+    """Base class of the PDF engines"""
+
+
+class PypdfExtractor(PdfExtractor):
+    """pypdf, pure Python (default)"""
+
+    name = "pypdf"
+
+    def page_count(self, file_path: str) -> int:
+        from pypdf import PdfReader
+        return len(PdfReader(file_path).pages)
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        from pypdf import PdfReader
+        reader = PdfReader(file_path)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+class PyPDF2Extractor(PdfExtractor):
+    """PyPDF2, the legacy pure Python package"""
+
+    name = "pypdf2"
+
+    def page_count(self, file_path: str) -> int:
+        from PyPDF2 import PdfReader
+        return len(PdfReader(file_path).pages)
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(file_path)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+class PyMuPDFExtractor(PdfExtractor):
+    """PyMuPDF (MuPDF bindings), native code and usually the fastest"""
+
+    name = "pymupdf"
+
+    def page_count(self, file_path: str) -> int:
+        import fitz
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        import fitz
+        with fitz.open(file_path) as doc:
+            return [doc[i].get_text() for i in range(start, end)]
+
+
+class PdfminerExtractor(PdfExtractor):
+    """pdfminer.six, slower but layout aware"""
+
+    name = "pdfminer"
+
+    def page_count(self, file_path: str) -> int:
+        from pdfminer.pdfpage import PDFPage
+        with open(file_path, "rb") as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        pages = []
+        for layout in extract_pages(file_path, page_numbers=range(start, end)):
+            pages.append("".join(
+                element.get_text() for element in layout if isinstance(element, LTTextContainer)
+            ))
+        return pages
+
+
+class WholeDocumentExtractor(DocumentExtractor):
+    """
+    Base class for formats that are read in one pass. "Pages" are the
+    document's own structural units (slides, sections) rather than
+    physical pages.
+    """
+
+    paginated = False
+
+    def extract_all(self, file_path: str) -> List[str]:
+        raise NotImplementedError
+
+    def page_count(self, file_path: str) -> int:
+        return len(self.extract_all(file_path))
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        return self.extract_all(file_path)[start:end]
+
+
+class DocxExtractor(WholeDocumentExtractor):
+    """Word documents via python-docx, one page per top-level section"""
+
+    name = "docx"
+
+    def extract_all(self, file_path: str) -> List[str]:
+        from docx import Document
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+
+        document = Document(file_path)
+        sections, lines = [], []
+        # Walk the body in order so tables stay next to the text around them
+        for element in document.element.body.iterchildren():
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'p':
+                paragraph = Paragraph(element, document)
+                style = paragraph.style.name if paragraph.style is not None else ""
+                if style in ("Title", "Heading 1") and lines:
+                    sections.append("\n".join(lines))
+                    lines = []
+                if paragraph.text.strip():
+                    lines.append(paragraph.text)
+            elif tag == 'tbl':
+                lines.extend(_table_rows(Table(element, document)))
+        if lines:
+            sections.append("\n".join(lines))
+        return sections
+
+
+class PptxExtractor(WholeDocumentExtractor):
+    """PowerPoint decks via python-pptx, one page per slide including speaker notes"""
+
+    name = "pptx"
+
+    def extract_all(self, file_path: str) -> List[str]:
+        from pptx import Presentation
+
+        slides = []
+        for slide in Presentation(file_path).slides:
+            lines = []
+            for shape in slide.shapes:
+                lines.extend(self._shape_text(shape))
+            if slide.has_notes_slide:
+                notes = slide.notes_slide.notes_text_frame.text.strip() if slide.notes_slide.notes_text_frame else ""
+                if notes:
+                    lines.append(f"Notes: {notes}")
+            slides.append("\n".join(lines))
+        return slides
+
+    def _shape_text(self, shape) -> List[str]:
+        from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+
+        # Footers, dates and slide numbers repeat on every slide
+        if shape.is_placeholder and shape.placeholder_format.type in (
+                PP_PLACEHOLDER.FOOTER, PP_PLACEHOLDER.DATE, PP_PLACEHOLDER.SLIDE_NUMBER):
+            return []
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            return [line for child in shape.shapes for line in self._shape_text(child)]
+        if shape.has_text_frame:
+            return [p.text for p in shape.text_frame.paragraphs if p.text.strip()]
+        if getattr(shape, "has_table", False):
+            return _table_rows(shape.table)
+        return []
+
+
+class PlainTextExtractor(WholeDocumentExtractor):
+    """Plain text and Markdown; form feeds separate pages"""
+
+    name = "text"
+
+    def extract_all(self, file_path: str) -> List[str]:
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            return f.read().split("\f")
+
+
+class HtmlExtractor(WholeDocumentExtractor):
+    """HTML pages via the standard library parser, one page per h1/h2 section"""
+
+    name = "html"
+
+    def extract_all(self, file_path: str) -> List[str]:
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            parser = _HtmlText()
+            parser.feed(f.read())
+            parser.close()
+        return parser.sections()
+
+
+class _HtmlText(HTMLParser):
+    SKIP = {"script", "style", "noscript", "template", "head", "nav", "svg"}
+    BLOCK = {"p", "div", "br", "li", "tr", "td", "th", "section", "article", "header", "footer",
+             "pre", "blockquote", "table", "ul", "ol", "hr", "dt", "dd", "figcaption",
+             "h1", "h2", "h3", "h4", "h5", "h6"}
+    SECTION = {"h1", "h2"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._sections: List[List[str]] = [[]]
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.SECTION and "".join(self._sections[-1]).strip():
+            self._sections.append([])
+        elif tag in self.BLOCK:
+            self._sections[-1].append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in self.BLOCK:
+            self._sections[-1].append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._sections[-1].append(re.sub(r"[ \t\r\f\v]+", " ", data))
+
+    def sections(self) -> List[str]:
+        pages = []
+        for parts in self._sections:
+            lines = (line.strip() for line in "".join(parts).split("\n"))
+            text = "\n".join(line for line in lines if line)
+            if text:
+                pages.append(text)
+        return pages
+
+
+def _table_rows(table) -> List[str]:
+    """One line per table row, cells separated by ' | '"""
+    rows = []
+    for row in table.rows:
+        cells = [cell.text.strip() for cell in row.cells]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return rows
+
+
+EXTRACTORS: Dict[str, Type[PdfExtractor]] = {
+    extractor.name: extractor
+    for extractor in (PypdfExtractor, PyPDF2Extractor, PyMuPDFExtractor, PdfminerExtractor)
+}
+
+FORMAT_EXTRACTORS: Dict[str, Type[WholeDocumentExtractor]] = {
+    extractor.name: extractor
+    for extractor in (DocxExtractor, PptxExtractor, PlainTextExtractor, HtmlExtractor)
+}
+
+# File extension -> extractor name for everything that is not a PDF
+FORMAT_ENGINES = {
+    ".docx": "docx",
+    ".pptx": "pptx",
+    ".txt": "text",
+    ".md": "text",
+    ".html": "html",
+    ".htm": "html"
+}
+
+
+def get_extractor(name: str = PDF_EXTRACTOR) -> DocumentExtractor:
+    """Return the extractor registered under `name`"""
+    if name in EXTRACTORS:
+        return EXTRACTORS[name]()
+    if name in FORMAT_EXTRACTORS:
+        return FORMAT_EXTRACTORS[name]()
+    raise ValueError(f"Unknown PDF extractor '{name}', expected one of: {', '.join(EXTRACTORS)}")
+
+
+def engine_for(file_path: str, pdf_engine: str = PDF_EXTRACTOR) -> str:
+    """Name of the extractor for a file, chosen by extension; PDFs use `pdf_engine`"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pdf":
+        return pdf_engine
+    if extension in FORMAT_ENGINES:
+        return FORMAT_ENGINES[extension]
+    raise ValueError(f"Unsupported file type '{extension or file_path}'")
+
+
+def available_extractors() -> List[str]:
+    """Names of the extractors whose backend package is installed"""
+    modules = {"pypdf": "pypdf", "pypdf2": "PyPDF2", "pymupdf": "fitz", "pdfminer": "pdfminer"}
+    available = []
+    for name in EXTRACTORS:
+        try:
+            __import__(modules[name])
+            available.append(name)
+        except ImportError:
+            pass
+    return available
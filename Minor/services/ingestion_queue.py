@@ -0,0 +1,351 @@
+"""
+Ingestion Queue Service
+Runs document processing in the background on a pool of worker threads
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import (
+    INGESTION_WORKERS, INGESTION_HEARTBEAT_SECONDS, INGESTION_STALE_SECONDS,
+    INGESTION_MAX_ATTEMPTS, INGESTION_RETRY_BACKOFF_SECONDS, INGESTION_BATCH_JOB_MB
+)
+from services.analytics import AnalyticsService
+from services.database import Database
+from services.document_processor import DocumentProcessor, IngestionCancelled
+from services.scheduler import FairScheduler, PRIORITY_HIGH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IngestionQueue:
+    """
+    Job queue driven by the documents.status column.
+    Uploads are registered as 'queued' and submitted here; a worker claims the
+    row ('processing') and finishes it as 'completed' or 'failed'.
+
+    Progress is checkpointed in the ingestion journal. A reaper thread keeps
+    the heartbeat of running jobs fresh and picks up jobs whose worker died
+    (e.g. the app restarted): they are requeued with exponential backoff and
+    resume from their last stored batch, or fail after INGESTION_MAX_ATTEMPTS.
+
+    Jobs are handed out by a FairScheduler: small documents and re-index jobs
+    first, then the uploader that has had the least work done so far, so a
+    large upload from one user cannot starve everyone else.
+    """
+
+    def __init__(self, db: Database, doc_processor: DocumentProcessor,
+                 analytics: Optional[AnalyticsService] = None, num_workers: int = INGESTION_WORKERS):
+        self.db = db
+        self.doc_processor = doc_processor
+        self.analytics = analytics
+        self.num_workers = max(1, num_workers)
+
+        self._queue = FairScheduler()
+        self._stop_event = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._active = set()  # doc ids being processed by this queue
+        self._active_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker pool and pick up documents left queued by a previous run"""
+        if self._workers:
+            return
+        for doc in self.db.get_ready_documents():
+            self.submit(doc['id'])
+
+        self._stop_event.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"ingestion-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        reaper = threading.Thread(target=self._reaper_loop, name="ingestion-reaper", daemon=True)
+        reaper.start()
+        self._workers.append(reaper)
+        logger.info(f"Ingestion queue started with {self.num_workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        """Signal workers to exit once their current job is done"""
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    def submit(self, doc_id: str, priority: Optional[int] = None):
+        """Submit a queued document for background processing"""
+        doc = self.db.get_document(doc_id)
+        if doc:
+            self._queue.put(doc_id, doc['uploaded_by'], _document_size(doc), priority)
+
+    def submit_batch(self, doc_ids: List[str]):
+        """
+        Submit queued documents as a batch. Consecutive documents are grouped
+        into jobs of at most INGESTION_BATCH_JOB_MB (and at least one job per
+        worker) that are each ingested with shared embedding batches. Keeping
+        jobs bounded lets other uploaders' work interleave with a large batch.
+        """
+        docs = [doc for doc in (self.db.get_document(doc_id) for doc_id in doc_ids) if doc]
+        if not docs:
+            return
+        uploader = docs[0]['uploaded_by']  # A batch is one user's upload
+        sizes = [_document_size(doc) for doc in docs]
+        job_limit = min(INGESTION_BATCH_JOB_MB * 1024 * 1024, sum(sizes) / self.num_workers)
+
+        group, group_size = [], 0
+        for doc, size in zip(docs, sizes):
+            if group and group_size + size > job_limit:
+                self._queue.put(group, uploader, group_size)
+                group, group_size = [], 0
+            group.append(doc['id'])
+            group_size += size
+        self._queue.put(group, uploader, group_size)
+
+    def submit_reindex(self, doc_ids: List[str]) -> int:
+        """
+        Re-chunk and re-index completed documents with the current chunking
+        settings. Page text comes from the page cache and unchanged chunks keep
+        their vectors, so only chunks whose text changed are embedded.
+        Returns the number of documents queued.
+        """
+        queued = 0
+        for doc_id in doc_ids:
+            doc = self.db.get_document(doc_id)
+            if doc and doc['status'] == 'completed' and not doc['source_doc_id']:
+                self.db.queue_document_revision(doc_id, doc['file_path'], doc['content_hash'])
+                self.submit(doc_id, priority=PRIORITY_HIGH)
+                queued += 1
+        return queued
+
+    def reap(self) -> Dict[str, int]:
+        """Requeue or fail documents whose worker stopped reporting, and submit due retries"""
+        requeued, failed = 0, 0
+        with self._active_lock:
+            active = set(self._active)
+        for doc in self.db.get_stale_documents(INGESTION_STALE_SECONDS):
+            if doc['id'] in active:
+                continue
+            attempts = doc['attempts']
+            if attempts >= INGESTION_MAX_ATTEMPTS:
+                self._abandon(doc, f"Processing was interrupted {attempts} times, giving up")
+                failed += 1
+            else:
+                delay = INGESTION_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+                if self.db.requeue_document(doc['id'], delay):
+                    logger.warning(f"Requeued stale document {doc['id']} (attempt {attempts}), retry in {delay}s")
+                    requeued += 1
+        for doc_id in self.db.take_due_retries():
+            self.submit(doc_id)
+        return {"requeued": requeued, "failed": failed}
+
+    def queue_status(self) -> Dict[str, Dict]:
+        """Per uploader: queued documents, jobs ahead and expected wait in seconds"""
+        return self._queue.queue_status(self.num_workers)
+
+    def user_queue_status(self, user_id: str) -> Dict:
+        """Queue depth and expected wait for one uploader"""
+        return self.queue_status().get(
+            user_id, {"queued_documents": 0, "jobs_ahead": None, "expected_wait_seconds": None}
+        )
+
+    def _reaper_loop(self):
+        while not self._stop_event.wait(INGESTION_HEARTBEAT_SECONDS):
+            try:
+                with self._active_lock:
+                    active = list(self._active)
+                self.db.touch_ingestion_heartbeats(active)
+                self.reap()
+            except Exception as e:
+                logger.error(f"Ingestion reaper failed: {str(e)}")
+
+    @contextmanager
+    def _working_on(self, doc_ids: List[str]):
+        """Keep the heartbeat of these documents alive while they are processed"""
+        with self._active_lock:
+            self._active.update(doc_ids)
+        try:
+            yield
+        finally:
+            with self._active_lock:
+                self._active.difference_update(doc_ids)
+
+    def _abandon(self, doc: dict, reason: str):
+        """Give up on a document that keeps getting interrupted"""
+        logger.error(f"Abandoning document {doc['id']}: {reason}")
+        if doc['revision_path']:
+            # The previous revision stays indexed
+            self.db.finish_document_revision(doc['id'], error_message=reason)
+        else:
+            self.doc_processor.discard_vectors(doc['id'])
+            self.db.update_document_status(doc['id'], "failed", error_message=reason)
+        self.db.clear_ingestion_journal(doc['id'])
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            job = self._queue.get(timeout=1.0)
+            if job is None:
+                continue
+            started = time.monotonic()
+            try:
+                if isinstance(job.payload, list):
+                    ingested = self._process_batch(job.payload)
+                else:
+                    ingested = self._process(job.payload)
+            except Exception as e:
+                # Keep the worker alive; the reaper requeues documents left processing
+                logger.error(f"Ingestion job for {', '.join(job.doc_ids)} failed: {str(e)}")
+                continue
+            # Skipped claims and reused uploads finish at once and would inflate the estimate
+            if ingested:
+                self._queue.record_throughput(ingested, time.monotonic() - started)
+
+    def _process(self, doc_id: str) -> int:
+        """Claim and process a single document, returns the bytes ingested"""
+        if not self.db.claim_document(doc_id):
+            # Already processed, claimed by another worker, or deleted
+            return 0
+
+        doc = self.db.get_document(doc_id)
+        if doc is None:
+            # Deleted right after it was claimed
+            return 0
+        with self._working_on([doc_id]):
+            if doc['revision_path']:
+                return self._process_revision(doc)
+            try:
+                result = self.doc_processor.process_pdf(
+                    file_path=doc['file_path'],
+                    doc_id=doc_id,
+                    filename=doc['filename'],
+                    uploaded_by=doc['uploaded_by'],
+                    content_hash=doc['content_hash']
+                )
+                self._complete(doc, result)
+            except Exception as e:
+                self._fail(doc_id, e)
+                return 0
+            return _ingested_size(doc, result)
+
+    def _process_batch(self, doc_ids: List[str]) -> int:
+        """Claim and ingest several documents as one job, returns the bytes ingested"""
+        docs = {}
+        ingested = 0
+        for doc_id in doc_ids:
+            if self.db.claim_document(doc_id):
+                doc = self.db.get_document(doc_id)
+                if doc is None:
+                    continue
+                if doc['revision_path']:
+                    with self._working_on([doc_id]):
+                        ingested += self._process_revision(doc)
+                else:
+                    docs[doc_id] = doc
+        if not docs:
+            return ingested
+        with self._working_on(list(docs)):
+            return ingested + self._ingest_batch(docs)
+
+    def _ingest_batch(self, docs: Dict[str, dict]) -> int:
+        """Run claimed documents through the processor as one batch, returns the bytes ingested"""
+        jobs = [
+            {
+                "doc_id": doc_id,
+                "file_path": doc['file_path'],
+                "filename": doc['filename'],
+                "uploaded_by": doc['uploaded_by'],
+                "content_hash": doc['content_hash']
+            }
+            for doc_id, doc in docs.items()
+        ]
+        finished = set()
+        ingested = 0
+        try:
+            for doc_id, result in self.doc_processor.process_batch(jobs):
+                finished.add(doc_id)
+                if isinstance(result, Exception):
+                    self._fail(doc_id, result)
+                else:
+                    self._complete(docs[doc_id], result)
+                    ingested += _ingested_size(docs[doc_id], result)
+        except Exception as e:
+            for doc_id in docs:
+                if doc_id not in finished:
+                    self._fail(doc_id, e)
+        return ingested
+
+    def _complete(self, doc: dict, result: dict):
+        """Mark a document as ready for queries"""
+        self.db.update_document_status(
+            doc['id'],
+            "completed",
+            chunks_created=result['chunks_created']
+        )
+        self.db.clear_ingestion_journal(doc['id'])
+        if self.analytics:
+            self.analytics.log_document_processed(
+                doc['uploaded_by'],
+                doc['id'],
+                result['chunks_created'],
+                boilerplate_chars_removed=result.get('boilerplate_chars_removed', 0)
+            )
+        logger.info(
+            f"Processed document {doc['id']} ({result['chunks_created']} chunks, "
+            f"{result.get('chunks_shared', 0)} shared with other documents, "
+            f"{result.get('boilerplate_chars_removed', 0)} boilerplate characters dropped)"
+        )
+
+    def _fail(self, doc_id: str, error: Exception):
+        """Mark a document as failed"""
+        if isinstance(error, IngestionCancelled):
+            # Deleted meanwhile, there is no row left to mark
+            logger.info(f"Document {doc_id} was deleted while being ingested")
+            self.db.clear_ingestion_journal(doc_id)
+            return
+        logger.error(f"Processing failed for document {doc_id}: {str(error)}")
+        self.db.update_document_status(doc_id, "failed", error_message=str(error))
+        self.db.clear_ingestion_journal(doc_id)
+
+    def _process_revision(self, doc: dict) -> int:
+        """Incrementally re-ingest a revised file for an existing document, returns the bytes ingested"""
+        doc_id = doc['id']
+        try:
+            result = self.doc_processor.update_pdf(
+                file_path=doc['revision_path'],
+                doc_id=doc_id,
+                filename=doc['filename'],
+                uploaded_by=doc['uploaded_by'],
+                content_hash=doc['revision_hash']
+            )
+            self.db.finish_document_revision(doc_id, chunks_created=result['chunks_created'])
+            self.doc_processor.release_retired(doc_id)
+            self.db.clear_ingestion_journal(doc_id)
+            logger.info(
+                f"Updated document {doc_id}: {result['chunks_added']} added, "
+                f"{result['chunks_removed']} removed, {result['chunks_unchanged']} unchanged"
+            )
+        except Exception as e:
+            logger.error(f"Update failed for document {doc_id}: {str(e)}")
+            self.db.finish_document_revision(doc_id, error_message=str(e))
+            self.db.clear_ingestion_journal(doc_id)
+            return 0
+        # A re-index whose chunks all kept their text embedded nothing
+        return _document_size(doc) if result['chunks_added'] else 0
+
+
+def _ingested_size(doc: dict, result: dict) -> int:
+    """Bytes a finished upload actually ingested, none if it reused an identical upload"""
+    return 0 if result.get('deduplicated_from') else _document_size(doc)
+
+
+def _document_size(doc: dict) -> int:
+    """Size in bytes of the file a document job will read"""
+    try:
+        return os.path.getsize(doc['revision_path'] or doc['file_path'])
+    except OSError:
+        return 0
@@ -0,0 +1,132 @@
+"""
+OCR Service
+Recovers the text of scanned pages in a separate, low-priority worker pool
+"""
+import logging
+import os
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional
+
+from config import (
+    OCR_ENABLED, OCR_WORKERS, OCR_NICE, OCR_LANGUAGE, OCR_DPI,
+    OCR_MIN_PAGE_CHARS, OCR_PAGE_TIMEOUT_SECONDS, EXTRACTION_MEMORY_LIMIT_MB
+)
+from services.text_extraction import WorkerCrashed, WorkerPool, WorkerTimeout, limit_worker_memory
+
+logger = logging.getLogger(__name__)
+
+_available: Optional[bool] = None
+
+
+def _init_ocr_worker(limit_mb: int, nice: int):
+    """Pool initializer: OCR yields the CPU to text extraction and the portal"""
+    limit_worker_memory(limit_mb)
+    if hasattr(os, "nice"):
+        os.nice(nice)
+
+
+_workers = WorkerPool(OCR_WORKERS, _init_ocr_worker, (EXTRACTION_MEMORY_LIMIT_MB, OCR_NICE))
+
+
+def ocr_available() -> bool:
+    """True if OCR is enabled and pymupdf, pytesseract and the Tesseract binary are installed"""
+    global _available
+    if _available is None:
+        try:
+            import fitz  # noqa: F401
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _available = True
+        except Exception:
+            _available = False
+    return OCR_ENABLED and _available
+
+
+def needs_ocr(text: str) -> bool:
+    """A page with (almost) no extractable text is probably a scanned image"""
+    return len("".join(text.split())) < OCR_MIN_PAGE_CHARS
+
+
+def _ocr_page(file_path: str, page_number: int, dpi: int = OCR_DPI, language: str = OCR_LANGUAGE) -> str:
+    """Render one page and run Tesseract on it, runs inside an OCR worker"""
+    import io
+    import fitz
+    import pytesseract
+    from PIL import Image
+
+    with fitz.open(file_path) as doc:
+        pixmap = doc[page_number].get_pixmap(dpi=dpi)
+    image = Image.open(io.BytesIO(pixmap.tobytes("png")))
+    return pytesseract.image_to_string(image, lang=language)
+
+
+class _PageOcr:
+    """An OCR job for one page"""
+
+    def __init__(self, file_path: str, page_number: int, fallback: str):
+        self.file_path = file_path
+        self.page_number = page_number
+        self.fallback = fallback
+        self.failed = False  # The fallback text was returned
+        self.task = _workers.submit(_ocr_page, file_path, page_number)
+
+    def result(self) -> str:
+        """OCR text, or the extracted text if OCR fails so the rest of the document still ingests"""
+        try:
+            # Counted from when a worker picks the page up, not from submission
+            return _workers.wait(self.task, OCR_PAGE_TIMEOUT_SECONDS)
+        except WorkerTimeout:
+            logger.warning(f"OCR timed out on page {self.page_number + 1} of {self.file_path}")
+        except WorkerCrashed:
+            logger.warning(f"OCR worker crashed on page {self.page_number + 1} of {self.file_path}")
+        except Exception as e:
+            logger.warning(f"OCR failed on page {self.page_number + 1} of {self.file_path}: {str(e)}")
+        self.failed = True
+        return self.fallback
+
+
+def iter_pages_with_ocr(file_path: str, pages: Iterable[str], window: Optional[int] = None,
+                        on_fallback: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """
+    Pass extracted pages through in order, replacing text-less pages with
+    their OCR text. Only those pages are rendered and OCRed; at most `window`
+    pages are held back waiting for OCR so memory stays bounded.
+    `on_fallback` is called with the number of every page whose OCR failed
+    and whose extracted text was passed through instead.
+    """
+    if not ocr_available():
+        yield from pages
+        return
+
+    def release(page) -> str:
+        if isinstance(page, str):
+            return page
+        text = page.result()
+        if page.failed and on_fallback:
+            on_fallback(page.page_number)
+        return text
+
+    window = window or OCR_WORKERS * 4
+    pending = deque()  # extracted text or a _PageOcr, in page order
+    jobs = 0
+    try:
+        for page_number, text in enumerate(pages):
+            if needs_ocr(text):
+                pending.append(_PageOcr(file_path, page_number, text))
+                jobs += 1
+            else:
+                pending.append(text)
+            # Release pages in order: plain text right away, OCR pages once done or the window is full
+            while pending and (isinstance(pending[0], str) or pending[0].task.done() or len(pending) > window):
+                page = pending.popleft()
+                yield release(page)
+
+        while pending:
+            page = pending.popleft()
+            yield release(page)
+    finally:
+        for page in pending:
+            if not isinstance(page, str):
+                _workers.kill(page.task)
+        if jobs:
+            logger.info(f"OCRed {jobs} text-less pages of {file_path}")
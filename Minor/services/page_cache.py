@@ -0,0 +1,114 @@
+"""
+Page Cache Service
+Stores the extracted text of every page once, keyed by file hash and page number
+"""
+import sqlite3
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+from config import PAGE_CACHE_PATH
+
+class PageCache:
+    """
+    Compact on-disk store of extracted page text (zlib-compressed in SQLite).
+    A file counts as cached only once all its pages were written, so an
+    interrupted extraction is simply redone.
+    """
+
+    def __init__(self, cache_path: str = PAGE_CACHE_PATH, write_batch: int = 32):
+        self.cache_path = cache_path
+        self.write_batch = write_batch
+        self._initialize_cache()
+
+    def get_connection(self):
+        """Get cache connection"""
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _initialize_cache(self):
+        """Create the cache tables"""
+        conn = self.get_connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                file_hash TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                text BLOB NOT NULL,
+                PRIMARY KEY (file_hash, page_number)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                file_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def page_count(self, file_hash: str) -> Optional[int]:
+        """Number of pages of a fully cached file, None if it is not cached"""
+        conn = self.get_connection()
+        row = conn.execute('SELECT page_count FROM files WHERE file_hash = ?', (file_hash,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def iter_pages(self, file_hash: str) -> Iterator[str]:
+        """Yield cached page texts in order"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute(
+                'SELECT text FROM pages WHERE file_hash = ? ORDER BY page_number',
+                (file_hash,)
+            )
+            for (blob,) in cursor:
+                yield zlib.decompress(blob).decode('utf-8')
+        finally:
+            conn.close()
+
+    def cache_pages(self, file_hash: str, pages: Iterable[str],
+                    is_complete: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """
+        Pass pages through while storing them; the file is marked cached at the
+        end, unless `is_complete` then returns False (some pages are a stopgap
+        that should be extracted again next time).
+        """
+        batch = []
+        page_number = 0
+        for page in pages:
+            batch.append((file_hash, page_number, zlib.compress(page.encode('utf-8'))))
+            page_number += 1
+            if len(batch) >= self.write_batch:
+                self._write(batch)
+                batch = []
+            yield page
+
+        self._write(batch)
+        if is_complete and not is_complete():
+            return
+        conn = self.get_connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO files (file_hash, page_count) VALUES (?, ?)',
+            (file_hash, page_number)
+        )
+        conn.commit()
+        conn.close()
+
+    def discard(self, content_hash: str):
+        """Drop every engine's cached pages of a file"""
+        # Keys are "<engine>:<content hash>"
+        pattern = f"%:{content_hash}"
+        conn = self.get_connection()
+        conn.execute('DELETE FROM files WHERE file_hash = ? OR file_hash LIKE ?', (content_hash, pattern))
+        conn.execute('DELETE FROM pages WHERE file_hash = ? OR file_hash LIKE ?', (content_hash, pattern))
+        conn.commit()
+        conn.close()
+
+    def _write(self, rows: list):
+        if not rows:
+            return
+        conn = self.get_connection()
+        conn.executemany('INSERT OR REPLACE INTO pages (file_hash, page_number, text) VALUES (?, ?, ?)', rows)
+        conn.commit()
+        conn.close()
@@ -0,0 +1,154 @@
+"""
+Ingestion Progress Service
+Live progress of the documents being ingested, published by DocumentProcessor
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class IngestionProgress:
+    """Progress of one document: pages extracted, chunks embedded and vectors written"""
+
+    def __init__(self, doc_id: str, filename: str = None, uploaded_by: str = None):
+        self.doc_id = doc_id
+        self.filename = filename
+        self.uploaded_by = uploaded_by
+        self.stage = "extracting"
+        self.pages_extracted = 0
+        self.pages_total: Optional[int] = None   # Unknown until the document has been opened
+        self.chunks_created = 0
+        self.chunks_embedded = 0
+        self.vectors_written = 0
+        self.extraction_done = False
+        self.started_at = time.monotonic()
+        self.updated_at = self.started_at
+
+    def copy(self) -> "IngestionProgress":
+        snapshot = IngestionProgress.__new__(IngestionProgress)
+        snapshot.__dict__.update(self.__dict__)
+        return snapshot
+
+    @property
+    def chunks_total(self) -> Optional[int]:
+        """Exact once extraction is done, otherwise extrapolated from the pages seen so far"""
+        if self.extraction_done:
+            return self.chunks_created
+        if not self.pages_total or not self.pages_extracted:
+            return None
+        estimate = round(self.chunks_created * self.pages_total / self.pages_extracted)
+        return max(estimate, self.chunks_created)
+
+    @property
+    def fraction(self) -> float:
+        """Share of the document's vectors written, 0.0 to 1.0"""
+        if self.stage == "stored":
+            return 1.0
+        total = self.chunks_total
+        if not total:
+            return 0.0
+        return min(self.vectors_written / total, 1.0)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time at the rate vectors have been written so far"""
+        fraction = self.fraction
+        if fraction <= 0 or fraction >= 1:
+            return None
+        elapsed = self.updated_at - self.started_at
+        return round(elapsed * (1 - fraction) / fraction, 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "doc_id": self.doc_id,
+            "filename": self.filename,
+            "stage": self.stage,
+            "pages_extracted": self.pages_extracted,
+            "pages_total": self.pages_total,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_total": self.chunks_total,
+            "vectors_written": self.vectors_written,
+            "fraction": self.fraction,
+            "eta_seconds": self.eta_seconds
+        }
+
+
+class ProgressTracker:
+    """
+    Thread-safe registry of in-flight ingestion progress. Readers poll
+    `get`/`active`, or `subscribe` to receive a snapshot on every update.
+    Finished documents are kept for `retain_seconds` so a final state can
+    still be shown.
+    """
+
+    def __init__(self, retain_seconds: float = 300):
+        self.retain_seconds = retain_seconds
+        self._progress: Dict[str, IngestionProgress] = {}
+        self._subscribers: List[Callable[[IngestionProgress], None]] = []
+        self._lock = threading.Lock()
+
+    def start(self, doc_id: str, filename: str = None, uploaded_by: str = None):
+        with self._lock:
+            self._progress[doc_id] = IngestionProgress(doc_id, filename, uploaded_by)
+            self._prune()
+        self._publish(doc_id)
+
+    def update(self, doc_id: str, **fields):
+        """Set fields of a document's progress, e.g. stage or pages_total"""
+        self._apply(doc_id, fields, increment=False)
+
+    def advance(self, doc_id: str, **counts):
+        """Add to counters of a document's progress, e.g. chunks_embedded=32"""
+        self._apply(doc_id, counts, increment=True)
+
+    def get(self, doc_id: str) -> Optional[IngestionProgress]:
+        with self._lock:
+            progress = self._progress.get(doc_id)
+            return progress.copy() if progress else None
+
+    def active(self, uploaded_by: str = None) -> List[IngestionProgress]:
+        """Documents still being ingested, optionally for one uploader"""
+        with self._lock:
+            return [
+                progress.copy() for progress in self._progress.values()
+                if progress.stage not in ("stored", "failed")
+                and (uploaded_by is None or progress.uploaded_by == uploaded_by)
+            ]
+
+    def subscribe(self, callback: Callable[[IngestionProgress], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[IngestionProgress], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _apply(self, doc_id: str, fields: Dict, increment: bool):
+        with self._lock:
+            progress = self._progress.get(doc_id)
+            if progress is None:
+                return
+            for name, value in fields.items():
+                setattr(progress, name, getattr(progress, name) + value if increment else value)
+            progress.updated_at = time.monotonic()
+        self._publish(doc_id)
+
+    def _publish(self, doc_id: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            progress = self._progress.get(doc_id)
+            if progress is None or not subscribers:
+                return
+            snapshot = progress.copy()
+        for callback in subscribers:
+            callback(snapshot)
+
+    def _prune(self):
+        """Forget documents that finished more than retain_seconds ago"""
+        cutoff = time.monotonic() - self.retain_seconds
+        for doc_id in [
+            doc_id for doc_id, progress in self._progress.items()
+            if progress.stage in ("stored", "failed") and progress.updated_at < cutoff
+        ]:
+            del self._progress[doc_id]
@@ -4,7 +4,7 @@ Handles retrieval-augmented generation for student queries
 """
 import os
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
@@ -14,17 +14,24 @@ from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
 
-from config import CHROMA_DB_DIR
+from config import CHROMA_DB_DIR, EMBEDDING_MODEL
+from services.chunk_store import backfill_document_chunks, hand_over_document, release_document
+from services.database import Database
+from services.document_directory import DocumentDirectory, format_source
+from services.embedding_service import get_embeddings
+from services.retrieval import retrieve
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RAGEngine:
-    def __init__(self):
+    def __init__(self, db: Optional[Database] = None):
         self.chroma_path = CHROMA_DB_DIR
-        self.embedding_model = "sentence-transformers/all-MiniLM-L6-v2"
+        self.db = db  # Shared chunk references, see services.chunk_store
+        # Chunks only carry a document key, names are resolved at answer time
+        self.directory = DocumentDirectory(db) if db else None
+        self.embedding_model = EMBEDDING_MODEL
         
         self.embeddings = self._initialize_embeddings()
         self.vectorstore = self._initialize_vectorstore()
@@ -34,12 +41,8 @@ class RAGEngine:
         self.conversational_rag_chain = self._create_conversational_rag_chain()
 
     def _initialize_embeddings(self):
-        """Initialize embeddings model"""
-        return HuggingFaceEmbeddings(
-            model_name=self.embedding_model,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        """Use the process-wide embeddings model shared with ingestion"""
+        return get_embeddings()
 
     def _initialize_vectorstore(self):
         """Initialize ChromaDB connection"""
@@ -62,8 +65,6 @@ class RAGEngine:
         Creates the conversational RAG chain manually using LCEL.
         This version ensures the output is a dictionary containing 'answer' and 'context'.
         """
-        retriever = self.vectorstore.as_retriever()
-
         # 1. Prompt and chain to reformulate the question based on history
         contextualize_q_system_prompt = (
             "Given a chat history and the latest user question "
@@ -103,7 +104,7 @@ class RAGEngine:
         # 3. Chain to retrieve documents
         def get_docs(input_dict):
             query = history_aware_query_chain.invoke(input_dict)
-            return retriever.invoke(query)
+            return self._retrieve(query)
 
         # 4. Manually construct the full chain to return a dictionary
         rag_chain = (
@@ -138,10 +139,7 @@ class RAGEngine:
 
             sources = []
             if 'context' in response_dict and response_dict['context']:
-                sources = list(set([
-                    doc.metadata.get("source", "Unknown")
-                    for doc in response_dict['context']
-                ]))
+                sources = self._source_names(response_dict['context'])
 
             return {
                 "answer": response_dict.get("answer", "Sorry, I encountered an issue and couldn't find an answer."),
@@ -153,36 +151,69 @@ class RAGEngine:
             logger.error(f"Error in answer_query: {str(e)}")
             raise
 
-    def get_documents_context(self, document_ids: List[str]) -> str:
+    def _retrieve(self, query: str) -> List[Any]:
+        """Most similar chunks of fully ingested documents"""
+        return retrieve(self.vectorstore, self.directory, query)
+
+    def _source_names(self, documents: List[Any]) -> List[str]:
+        """Display names of the documents retrieved chunks belong to, in retrieval order"""
+        doc_ids = [doc.metadata.get("doc_id") for doc in documents if doc.metadata.get("doc_id")]
+        labels = self.directory.resolve(doc_ids) if self.directory else {}
+        names = [
+            format_source(labels[doc.metadata.get("doc_id")]) if doc.metadata.get("doc_id") in labels
+            else doc.metadata.get("filename", "Unknown")  # Legacy chunks carry their filename
+            for doc in documents
+        ]
+        return list(dict.fromkeys(names))
+
+    def get_documents_context(self, document_ids: List[str], max_chunks: int = 20) -> str:
         """
-        Retrieve concatenated context from specific documents.
-        This implementation fetches all data and filters in Python to ensure robustness.
+        Retrieve concatenated context from specific documents: their first
+        max_chunks chunks, in document order. Chunks are found through the
+        chunk registry and only those read, so the cost follows the size of
+        the documents rather than of the whole collection.
         """
         try:
             all_chunks = []
-            # Fetch all data from the collection
-            all_data = self.vectorstore._collection.get(include=["metadatas", "documents"])
-            
-            if not all_data['documents']:
-                logger.warning("Vector store returned no documents.")
-                return ""
-
-            # Filter in Python
-            for i, metadata in enumerate(all_data['metadatas']):
-                if metadata and metadata.get('doc_id') in document_ids:
-                    all_chunks.append(all_data['documents'][i])
-            
+            for doc_id in document_ids:
+                if len(all_chunks) >= max_chunks:
+                    break
+                all_chunks.extend(self._document_chunks(doc_id, max_chunks - len(all_chunks)))
+
             if not all_chunks:
-                logger.warning(f"No chunks found for document IDs: {document_ids}. Total items checked: {len(all_data['documents'])}")
+                logger.warning(f"No chunks found for document IDs: {document_ids}")
 
-            # Concatenate and limit to reasonable size
-            context = "\n\n".join(all_chunks[:20])
-            return context
+            return "\n\n".join(all_chunks)
             
         except Exception as e:
             logger.error(f"Error retrieving documents context: {str(e)}")
             return ""
 
+    def _document_chunks(self, doc_id: str, limit: int) -> List[str]:
+        """Text of the first `limit` retrievable chunks of one document"""
+        collection = self.vectorstore._collection
+        if not self.db:
+            stored = collection.get(where={"doc_id": doc_id}, include=["metadatas", "documents"])
+            ordered = sorted(zip(stored['metadatas'], stored['documents']), key=lambda c: c[0].get('chunk_index', 0))
+            return [text for _, text in ordered][:limit]
+
+        backfill_document_chunks(collection, self.db, doc_id)
+        texts, offset = [], 0
+        while len(texts) < limit:
+            # Owned and shared chunks in order; a revision in progress can add hidden ones
+            page = self.db.get_document_chunk_ids(doc_id, limit=limit, offset=offset)
+            if not page:
+                break
+            offset += len(page)
+            stored = collection.get(ids=list({row['vector_id'] for row in page}), include=["metadatas", "documents"])
+            found = dict(zip(stored['ids'], zip(stored['metadatas'], stored['documents'])))
+            chunks = [found[row['vector_id']] for row in page if row['vector_id'] in found]
+            # Chunks shared from another document carry its metadata and are always kept
+            owned = [metadata.get('doc_id') == doc_id for metadata, _ in chunks]
+            visible = iter(self.directory.visible([metadata for (metadata, _), own in zip(chunks, owned) if own]))
+            texts.extend(text for (_, text), own in zip(chunks, owned) if not own or next(visible))
+        return texts[:limit]
+
     def check_vectorstore(self) -> str:
         """Health check for vector store"""
         try:
@@ -201,13 +232,19 @@ class RAGEngine:
             logger.error(f"LLM check failed: {e}")
             return "unavailable"
 
-    def delete_document(self, doc_id: str):
-        """Delete document from vector store"""
+    def hand_over_document(self, doc_id: str, new_owner: str):
+        """Give the vectors of a document about to be deleted to an identical upload that reuses them"""
+        try:
+            hand_over_document(self.vectorstore._collection, self.db, doc_id, new_owner)
+        except Exception as e:
+            logger.error(f"Error handing over document: {str(e)}")
+            raise
+
+    def delete_document(self, doc_id: str, owned: Optional[List[str]] = None):
+        """Delete document from vector store, chunks other documents share are handed over to them"""
         try:
-            results = self.vectorstore.get(where={"doc_id": doc_id})
-            if results and results['ids']:
-                self.vectorstore.delete(ids=results['ids'])
-                logger.info(f"Deleted vectors for document {doc_id}")
+            release_document(self.vectorstore._collection, self.db, doc_id, owned)
+            logger.info(f"Deleted vectors for document {doc_id}")
         except Exception as e:
             logger.error(f"Error deleting document: {str(e)}")
             raise
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Retrieval Service
+Similarity search over the faculty documents collection, shared by RAGEngine
+and the benchmarks
+"""
+from typing import List, Optional
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from config import RETRIEVAL_FETCH_K, RETRIEVAL_TOP_K
+from services.document_directory import DocumentDirectory
+
+
+def retrieve(vectorstore: Chroma, directory: Optional[DocumentDirectory], query: str,
+             k: int = RETRIEVAL_TOP_K, fetch_k: int = RETRIEVAL_FETCH_K) -> List[Document]:
+    """Most similar chunks, skipping documents (and revisions) that are not fully ingested yet"""
+    if not directory:
+        return vectorstore.similarity_search(query, k=k)
+    candidates = vectorstore.similarity_search(query, k=fetch_k)
+    visible = directory.visible([doc.metadata for doc in candidates])
+    return [doc for doc, keep in zip(candidates, visible) if keep][:k]
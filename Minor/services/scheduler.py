@@ -0,0 +1,145 @@
+"""
+Ingestion Scheduler
+Fair-share, priority-aware ordering of ingestion jobs across uploaders
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+from config import (
+    INGESTION_SMALL_DOCUMENT_MB, INGESTION_PRIORITY_AGING_SECONDS, INGESTION_INITIAL_MB_PER_SECOND
+)
+
+PRIORITY_HIGH = 0    # Admin re-index jobs and small documents
+PRIORITY_NORMAL = 1
+
+SMALL_DOCUMENT_BYTES = INGESTION_SMALL_DOCUMENT_MB * 1024 * 1024
+
+
+class Job:
+    """One unit of work: a document id, or a list of ids ingested together"""
+
+    def __init__(self, payload: Union[str, List[str]], uploader: str, size_bytes: int,
+                 priority: Optional[int] = None, sequence: int = 0):
+        self.payload = payload
+        self.uploader = uploader
+        self.size_bytes = max(size_bytes, 1)
+        if priority is None:
+            priority = PRIORITY_HIGH if size_bytes <= SMALL_DOCUMENT_BYTES else PRIORITY_NORMAL
+        self.priority = priority
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def doc_ids(self) -> List[str]:
+        return self.payload if isinstance(self.payload, list) else [self.payload]
+
+    def effective_priority(self, now: float) -> int:
+        """Priority after aging, so large jobs are never starved by a stream of small ones"""
+        waited_levels = int((now - self.enqueued_at) // INGESTION_PRIORITY_AGING_SECONDS)
+        return max(PRIORITY_HIGH, self.priority - waited_levels)
+
+
+class FairScheduler:
+    """
+    Thread-safe job queue. The next job is the best priority class first;
+    within a class the uploader that has received the least service (bytes
+    ingested) goes first, then FIFO. A newly active uploader starts level
+    with the least served active uploader, so past usage neither penalises
+    nor favours anyone.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, List[Job]] = {}  # uploader -> jobs in arrival order
+        self._served: Dict[str, float] = {}       # uploader -> bytes dispatched
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._bytes_per_second = INGESTION_INITIAL_MB_PER_SECOND * 1024 * 1024
+
+    def put(self, payload: Union[str, List[str]], uploader: str, size_bytes: int,
+            priority: Optional[int] = None):
+        with self._condition:
+            if not self._pending.get(uploader):
+                active = [self._served.get(u, 0.0) for u, jobs in self._pending.items() if jobs]
+                floor = min(active) if active else max(self._served.values(), default=0.0)
+                self._served[uploader] = max(self._served.get(uploader, 0.0), floor)
+            self._pending.setdefault(uploader, []).append(
+                Job(payload, uploader, size_bytes, priority, next(self._sequence))
+            )
+            self._condition.notify()
+
+    def get(self, timeout: float) -> Optional[Job]:
+        """Next job to run, or None if nothing arrived within timeout"""
+        with self._condition:
+            if not self._condition.wait_for(self._has_jobs, timeout=timeout):
+                return None
+            job = self._select(self._pending, self._served, time.monotonic())
+            self._pending[job.uploader].remove(job)
+            self._served[job.uploader] = self._served.get(job.uploader, 0.0) + job.size_bytes
+            return job
+
+    def record_throughput(self, size_bytes: int, seconds: float):
+        """Feed a finished job's duration into the wait estimate (exponential moving average)"""
+        if seconds <= 0:
+            return
+        with self._condition:
+            self._bytes_per_second = 0.8 * self._bytes_per_second + 0.2 * (size_bytes / seconds)
+
+    def queue_status(self, num_workers: int) -> Dict[str, Dict]:
+        """
+        Per uploader: queued documents, jobs ahead of their first job and the
+        expected wait in seconds, from a dry run of the current schedule.
+        """
+        with self._condition:
+            pending = {u: list(jobs) for u, jobs in self._pending.items() if jobs}
+            served = dict(self._served)
+            bytes_per_second = self._bytes_per_second
+
+        now = time.monotonic()
+        status = {
+            uploader: {"queued_documents": sum(len(job.doc_ids) for job in jobs),
+                       "jobs_ahead": None, "expected_wait_seconds": None}
+            for uploader, jobs in pending.items()
+        }
+        # An uploader's jobs leave in (priority, arrival) order, so the dry run
+        # only has to merge the uploaders' next jobs, until each one is placed
+        queues = {
+            uploader: sorted(jobs, key=lambda job: (job.effective_priority(now), job.sequence))
+            for uploader, jobs in pending.items()
+        }
+        heads = [(queue[0].effective_priority(now), served.get(uploader, 0.0), queue[0].sequence, uploader, 0)
+                 for uploader, queue in queues.items()]
+        heapq.heapify(heads)
+        bytes_ahead, position, unplaced = 0, 0, len(status)
+        while unplaced:
+            _, _, _, uploader, index = heapq.heappop(heads)
+            job = queues[uploader][index]
+            entry = status[uploader]
+            if entry["jobs_ahead"] is None:
+                entry["jobs_ahead"] = position
+                # Jobs ahead are spread over the workers
+                entry["expected_wait_seconds"] = round(bytes_ahead / bytes_per_second / max(num_workers, 1), 1)
+                unplaced -= 1
+            served[uploader] = served.get(uploader, 0.0) + job.size_bytes
+            bytes_ahead += job.size_bytes
+            position += 1
+            if index + 1 < len(queues[uploader]):
+                following = queues[uploader][index + 1]
+                heapq.heappush(heads, (following.effective_priority(now), served[uploader],
+                                       following.sequence, uploader, index + 1))
+        return status
+
+    def _has_jobs(self) -> bool:
+        return any(self._pending.values())
+
+    def _select(self, pending: Dict[str, List[Job]], served: Dict[str, float], now: float) -> Job:
+        """Best job over all uploaders: (priority class, uploader's service, arrival)"""
+        best, best_key = None, None
+        for uploader, jobs in pending.items():
+            for job in jobs:
+                key = (job.effective_priority(now), served.get(uploader, 0.0), job.sequence)
+                if best_key is None or key < best_key:
+                    best, best_key = job, key
+        return best
@@ -0,0 +1,91 @@
+"""
+Text Cleaning Service
+Removes running headers, footers and page numbers repeated across pages
+"""
+import math
+import re
+from collections import Counter
+from typing import Iterable, Iterator, List, Set
+
+from config import BOILERPLATE_SAMPLE_PAGES, BOILERPLATE_MIN_PAGE_RATIO
+
+DIGITS = re.compile(r"\d+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def _line_key(line: str) -> str:
+    """Normalize a line so 'Page 3 of 40' and 'Page 4 of 40' compare equal"""
+    return WHITESPACE.sub(" ", DIGITS.sub("#", line)).strip().lower()
+
+
+class BoilerplateFilter:
+    """
+    Strips lines that repeat near the top or bottom of many pages (running
+    headers, footers, page numbers, copyright lines). Repeated lines are
+    learned from the first `sample_pages` pages, which are the only pages
+    held in memory; the rest of the document is cleaned as it streams.
+    Use one filter per document; `characters_removed` and `lines_removed`
+    report what was dropped.
+    """
+
+    def __init__(self, sample_pages: int = BOILERPLATE_SAMPLE_PAGES,
+                 min_page_ratio: float = BOILERPLATE_MIN_PAGE_RATIO,
+                 edge_lines: int = 3, min_pages: int = 3):
+        self.sample_pages = sample_pages
+        self.min_page_ratio = min_page_ratio
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.boilerplate: Set[str] = set()
+        self.characters_removed = 0
+        self.lines_removed = 0
+
+    def strip(self, pages: Iterable[str]) -> Iterator[str]:
+        """Yield the pages with boilerplate lines removed"""
+        pages = iter(pages)
+        sample = []
+        for page in pages:
+            sample.append(page)
+            if len(sample) >= self.sample_pages:
+                break
+        self.boilerplate = self._learn(sample)
+
+        for page in sample:
+            yield self._clean(page)
+        for page in pages:
+            yield self._clean(page)
+
+    def _edges(self, page: str) -> List[str]:
+        """The first and last few non-empty lines of a page"""
+        lines = [line for line in page.splitlines() if line.strip()]
+        if len(lines) <= 2 * self.edge_lines:
+            return lines
+        return lines[:self.edge_lines] + lines[-self.edge_lines:]
+
+    def _learn(self, sample: List[str]) -> Set[str]:
+        """Line keys found on the edges of enough sampled pages"""
+        if len(sample) < self.min_pages:
+            return set()
+        counts = Counter()
+        for page in sample:
+            counts.update({_line_key(line) for line in self._edges(page)})
+        threshold = max(self.min_pages, math.ceil(len(sample) * self.min_page_ratio))
+        return {key for key, count in counts.items() if key and count >= threshold}
+
+    def _clean(self, page: str) -> str:
+        if not self.boilerplate:
+            return page
+        lines = page.splitlines()
+        non_empty = [i for i, line in enumerate(lines) if line.strip()]
+        # Only lines at the page edges are candidates, the body is never touched
+        edges = set(non_empty[:self.edge_lines] + non_empty[-self.edge_lines:])
+        kept = []
+        for index, line in enumerate(lines):
+            if index in edges and _line_key(line) in self.boilerplate:
+                self.lines_removed += 1
+            else:
+                kept.append(line)
+        if len(kept) == len(lines):
+            return page
+        cleaned = "\n".join(kept)
+        self.characters_removed += len(page) - len(cleaned)
+        return cleaned
@@ -0,0 +1,297 @@
+"""
+Text Extraction Service
+Parallel, page-level text extraction from documents in sandboxed worker processes
+"""
+import concurrent.futures
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterator, List, Optional
+
+from config import (
+    EXTRACTION_WORKERS, EXTRACTION_BATCH_PAGES, EXTRACTION_TIMEOUT_SECONDS,
+    EXTRACTION_MEMORY_LIMIT_MB, PDF_EXTRACTOR
+)
+from services.extractors import engine_for, get_extractor
+
+_QUEUED_POLL_SECONDS = 0.5  # How often a wait checks whether a queued task has started
+
+
+class ExtractionError(Exception):
+    """Extraction was aborted: timed out, hit the memory limit or crashed its worker"""
+
+
+class WorkerTimeout(Exception):
+    """A task ran past its time limit; its worker was killed"""
+
+
+class WorkerCrashed(Exception):
+    """The worker process died while running a task"""
+
+
+def limit_worker_memory(limit_mb: int):
+    """Pool initializer: cap the address space of a worker process"""
+    if limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return  # Not available on Windows, workers run uncapped
+    limit = limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, initializer, initargs: tuple):
+    """Body of a worker process: run tasks received over the pipe, one at a time"""
+    if initializer:
+        initializer(*initargs)
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            outcome = (True, fn(*args))
+        except BaseException as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send((False, RuntimeError(str(e))))
+
+
+class Task(concurrent.futures.Future):
+    """A submitted call; started_at is set once a worker begins running it"""
+
+    def __init__(self, fn, args: tuple):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.started_at: Optional[float] = None
+        self.worker: Optional["_Worker"] = None
+        self.killed = False
+
+
+class _Worker:
+    """One worker process and the thread in this process that feeds it tasks"""
+
+    def __init__(self, pool: "WorkerPool"):
+        self.pool = pool
+        self.process = None
+        self.conn = None
+        self.task: Optional[Task] = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        while True:
+            task = self.pool._tasks.get()
+            if not task.set_running_or_notify_cancel():
+                continue
+            try:
+                self._ensure_process()
+                with self.lock:
+                    self.task = task
+                    task.worker = self
+                    task.started_at = time.monotonic()
+                self.conn.send((task.fn, task.args))
+                succeeded, value = self.conn.recv()
+            except (EOFError, OSError):
+                self._discard_process()
+                task.set_exception(WorkerTimeout() if task.killed else WorkerCrashed())
+                continue
+            except Exception as e:
+                # The task could not be pickled; the worker is still usable
+                task.set_exception(e)
+                continue
+            finally:
+                with self.lock:
+                    self.task = None
+            if succeeded:
+                task.set_result(value)
+            else:
+                task.set_exception(value)
+
+    def kill(self, task: Task):
+        """Kill the process if it is still running `task`"""
+        with self.lock:
+            if self.task is task and self.process is not None:
+                task.killed = True
+                self.process.kill()
+
+    def _ensure_process(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        self._discard_process()
+        # spawn: the portal process is multi-threaded, forking it is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.pool.initializer, self.pool.initargs),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def _discard_process(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+        self.process, self.conn = None, None
+
+
+class WorkerPool:
+    """
+    Process pool started on first use. Every worker is a separate process
+    running one task at a time, so a task that times out or crashes takes
+    down only its own worker, which is replaced for the next task; tasks of
+    other documents keep running.
+    """
+
+    def __init__(self, max_workers: int, initializer=None, initargs: tuple = ()):
+        self.max_workers = max(max_workers, 1)
+        self.initializer = initializer
+        self.initargs = initargs
+        self._tasks: "queue.Queue[Task]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> Task:
+        with self._lock:
+            if not self._workers:
+                for index in range(self.max_workers):
+                    worker = _Worker(self)
+                    threading.Thread(target=worker.run, name=f"pool-feeder-{index}", daemon=True).start()
+                    self._workers.append(worker)
+        task = Task(fn, args)
+        self._tasks.put(task)
+        return task
+
+    def wait(self, task: Task, timeout: float, not_before: Optional[float] = None):
+        """
+        Result of a task, raising WorkerTimeout once it has been running for
+        `timeout` seconds (counted from `not_before` if that is later). Time
+        spent queued behind other tasks does not count.
+        """
+        while True:
+            started_at = task.started_at
+            if started_at is None:
+                try:
+                    return task.result(timeout=_QUEUED_POLL_SECONDS)
+                except concurrent.futures.TimeoutError:
+                    continue
+            running_since = max(started_at, not_before or started_at)
+            try:
+                return task.result(timeout=max(timeout - (time.monotonic() - running_since), 0))
+            except concurrent.futures.TimeoutError:
+                self.kill(task)
+                raise WorkerTimeout()
+
+    def kill(self, task: Task):
+        """Stop a task: dropped if still queued, its worker killed if running"""
+        if task.cancel():
+            return
+        if task.worker is not None and not task.done():
+            task.worker.kill(task)
+
+
+_workers = WorkerPool(EXTRACTION_WORKERS, limit_worker_memory, (EXTRACTION_MEMORY_LIMIT_MB,))
+
+
+class _Budget:
+    """Extraction time left for one document, counting only time its tasks spend running"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.remaining = timeout
+
+    def wait(self, task: Task):
+        start = time.monotonic()
+        try:
+            return _workers.wait(task, max(self.remaining, 0), not_before=start)
+        except WorkerTimeout:
+            raise ExtractionError(f"Text extraction timed out after {self.timeout} seconds")
+        except MemoryError:
+            raise ExtractionError(f"Text extraction exceeded the {EXTRACTION_MEMORY_LIMIT_MB} MB memory limit")
+        except WorkerCrashed:
+            raise ExtractionError("Text extraction worker crashed, the file may be malformed")
+        finally:
+            if task.started_at is not None:
+                self.remaining -= time.monotonic() - max(start, task.started_at)
+
+
+def _extract_page_range(file_path: str, start: int, end: int, engine: str = PDF_EXTRACTOR) -> List[str]:
+    """Extract the text of pages [start, end), runs inside a pool worker"""
+    return get_extractor(engine).extract_pages(file_path, start, end)
+
+
+def _count_pages(file_path: str, engine: str = PDF_EXTRACTOR) -> int:
+    """Runs inside a pool worker"""
+    return get_extractor(engine).page_count(file_path)
+
+
+def _extract_all(file_path: str, engine: str) -> List[str]:
+    """Extract every page of a document read in one pass, runs inside a pool worker"""
+    return get_extractor(engine).extract_all(file_path)
+
+
+def iter_document_pages(file_path: str, max_workers: int = EXTRACTION_WORKERS,
+                        batch_pages: int = EXTRACTION_BATCH_PAGES, pdf_engine: str = PDF_EXTRACTOR,
+                        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+                        on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """
+    Yield the text of each page of any supported document. PDFs are split
+    into page ranges across the pool; other formats are read by their native
+    extractor in a single sandboxed task. `on_page_count` is called with the
+    number of pages as soon as it is known.
+    """
+    engine = engine_for(file_path, pdf_engine)
+    if get_extractor(engine).paginated:
+        yield from iter_pdf_pages(file_path, max_workers, batch_pages, engine, timeout, on_page_count)
+    else:
+        pages = _Budget(timeout).wait(_workers.submit(_extract_all, file_path, engine))
+        if on_page_count:
+            on_page_count(len(pages))
+        yield from pages
+
+
+def iter_pdf_pages(file_path: str, max_workers: int = EXTRACTION_WORKERS,
+                   batch_pages: int = EXTRACTION_BATCH_PAGES, engine: str = PDF_EXTRACTOR,
+                   timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+                   on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """
+    Yield the text of each page in order, using the given extraction engine.
+    Pages are extracted in page-range batches across the process pool; only a
+    small window of batches is in flight so results never pile up in memory.
+
+    The PDF is never parsed in this process. Workers are memory capped, and a
+    document whose tasks run for more than `timeout` seconds in total has
+    its workers killed and raises ExtractionError.
+    """
+    budget = _Budget(timeout)
+    num_pages = budget.wait(_workers.submit(_count_pages, file_path, engine))
+    if on_page_count:
+        on_page_count(num_pages)
+    ranges = iter([(start, min(start + batch_pages, num_pages)) for start in range(0, num_pages, batch_pages)])
+
+    in_flight = deque()
+    try:
+        for start, end in itertools.islice(ranges, max(max_workers, 1) * 2):
+            in_flight.append(_workers.submit(_extract_page_range, file_path, start, end, engine))
+        while in_flight:
+            pages = budget.wait(in_flight.popleft())
+            next_range = next(ranges, None)
+            if next_range:
+                in_flight.append(_workers.submit(_extract_page_range, file_path, *next_range, engine))
+            yield from pages
+    finally:
+        # Abandoned (failed or closed early): free the workers this document still holds
+        for task in in_flight:
+            _workers.kill(task)
@@ -0,0 +1,96 @@
+"""
+Vector Store Writer
+Single long-lived writer for the faculty documents collection. Ingestion
+workers hand it embedded chunk batches; it coalesces them into large upserts
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+from config import VECTOR_WRITE_BATCH_SIZE, VECTOR_WRITE_MAX_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+
+class _WriteRequest:
+    """One worker's batch of embedded chunks and the future it waits on"""
+
+    def __init__(self, ids: List[str], embeddings: List, documents: List[str], metadatas: List[Dict[str, Any]]):
+        self.ids = ids
+        self.embeddings = embeddings
+        self.documents = documents
+        self.metadatas = metadatas
+        self.future: Future = Future()
+
+
+class VectorStoreWriter:
+    """
+    Thread-safe, coalescing writer. `upsert` blocks until the batch is
+    written, so callers can checkpoint right after it returns. Batches
+    arriving from several workers within `max_wait_ms` of each other are
+    written with one call of up to `batch_size` vectors.
+    """
+
+    def __init__(self, collection, batch_size: int = VECTOR_WRITE_BATCH_SIZE,
+                 max_wait_ms: int = VECTOR_WRITE_MAX_WAIT_MS):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._requests: "queue.Queue[_WriteRequest]" = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="vector-writer", daemon=True)
+        self._thread.start()
+
+    def upsert(self, ids: List[str], embeddings: List, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Write one batch of embedded chunks, raising if the write failed"""
+        if not ids:
+            return
+        request = _WriteRequest(ids, embeddings, documents, metadatas)
+        self._requests.put(request)
+        request.future.result()
+
+    def _write_loop(self):
+        while True:
+            requests = self._collect(self._requests.get())
+            try:
+                self._write(requests)
+            except Exception as e:
+                if len(requests) == 1:
+                    requests[0].future.set_exception(e)
+                    continue
+                # Write every batch on its own so one bad batch fails only its sender
+                logger.warning(f"Coalesced write of {len(requests)} batches failed, retrying one by one: {str(e)}")
+                for request in requests:
+                    try:
+                        self._write([request])
+                    except Exception as request_error:
+                        request.future.set_exception(request_error)
+                        continue
+                    request.future.set_result(len(request.ids))
+                continue
+            for request in requests:
+                request.future.set_result(len(request.ids))
+
+    def _collect(self, first: _WriteRequest) -> List[_WriteRequest]:
+        """Batches waiting or arriving within the wait window, up to batch_size vectors"""
+        requests, size = [first], len(first.ids)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while size < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request.ids)
+        return requests
+
+    def _write(self, requests: List[_WriteRequest]):
+        self.collection.upsert(
+            ids=[vector_id for request in requests for vector_id in request.ids],
+            embeddings=[embedding for request in requests for embedding in request.embeddings],
+            documents=[document for request in requests for document in request.documents],
+            metadatas=[metadata for request in requests for metadata in request.metadatas]
+        )
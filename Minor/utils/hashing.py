@@ -0,0 +1,23 @@
+"""
+Hashing utilities for document ingestion
+"""
+
+import hashlib
+import re
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """Compute the SHA-256 hex digest of a file without loading it whole"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chunk with whitespace normalized, so reflowed copies hash alike"""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,20 @@
+"""
+Shared ingestion services
+One document processor and background ingestion worker pool per server
+process, used by every page that uploads, deletes or re-indexes documents
+"""
+import streamlit as st
+
+from services.analytics import AnalyticsService
+from services.database import Database
+from services.document_processor import DocumentProcessor
+from services.ingestion_queue import IngestionQueue
+
+
+@st.cache_resource
+def get_ingestion_queue() -> IngestionQueue:
+    """Start one background ingestion worker pool per server process"""
+    db = Database()
+    ingestion_queue = IngestionQueue(db, DocumentProcessor(db), AnalyticsService(db))
+    ingestion_queue.start()
+    return ingestion_queue
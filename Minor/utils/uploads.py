@@ -0,0 +1,114 @@
+"""
+Upload handling utilities for the Faculty Portal
+"""
+
+import hashlib
+import os
+import uuid
+import zipfile
+from typing import BinaryIO, Dict, List, Tuple
+
+from config import MAX_UPLOAD_SIZE_MB, SUPPORTED_EXTENSIONS
+from utils.hashing import HASH_BLOCK_SIZE
+
+MAX_UPLOAD_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """An uploaded file is over MAX_UPLOAD_SIZE_MB"""
+
+
+def write_stream(source: BinaryIO, file_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str]:
+    """
+    Copy a file-like object to disk block by block, hashing it on the way.
+    Returns (size in bytes, SHA-256 hex digest) so the file never has to be
+    read back to be hashed. Stops and removes the partial file as soon as it
+    grows past max_bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as target:
+            for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"{os.path.basename(file_path)} is larger than {max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(block)
+                target.write(block)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return size, digest.hexdigest()
+
+
+def save_uploaded_file(uploaded_file, file_path: str) -> str:
+    """Stream a Streamlit upload to file_path and return its SHA-256"""
+    # Reject on the size Streamlit reports before writing anything
+    if getattr(uploaded_file, "size", 0) > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(f"{uploaded_file.name} is larger than {MAX_UPLOAD_SIZE_MB} MB")
+    uploaded_file.seek(0)
+    _, content_hash = write_stream(uploaded_file, file_path)
+    return content_hash
+
+
+def expand_uploads(uploaded_files, upload_dir: str) -> List[Dict]:
+    """
+    Save uploaded documents and the documents inside uploaded ZIP archives.
+    Returns one {doc_id, filename, file_path, content_hash} entry per
+    document; archive members of unsupported formats or over
+    MAX_UPLOAD_SIZE_MB are skipped, a larger top-level file raises
+    UploadTooLargeError.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    documents = []
+    try:
+        for uploaded_file in uploaded_files:
+            if uploaded_file.name.lower().endswith('.zip'):
+                documents.extend(_expand_zip(uploaded_file, upload_dir))
+            elif uploaded_file.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                doc_id = str(uuid.uuid4())
+                file_path = os.path.join(upload_dir, f"{doc_id}_{uploaded_file.name}")
+                documents.append({
+                    "doc_id": doc_id,
+                    "filename": uploaded_file.name,
+                    "file_path": file_path,
+                    "content_hash": save_uploaded_file(uploaded_file, file_path)
+                })
+    except Exception:
+        # The upload is rejected as a whole, do not leave the files saved so far behind
+        for document in documents:
+            if os.path.exists(document['file_path']):
+                os.remove(document['file_path'])
+        raise
+    return documents
+
+
+def _expand_zip(uploaded_file, upload_dir: str) -> List[Dict]:
+    """Extract supported members of a ZIP upload, one document per member"""
+    documents = []
+    with zipfile.ZipFile(uploaded_file) as archive:
+        for info in archive.infolist():
+            filename = os.path.basename(info.filename)
+            if (info.is_dir() or not filename or filename.startswith('.')
+                    or '__MACOSX' in info.filename
+                    or not filename.lower().endswith(SUPPORTED_EXTENSIONS)
+                    or info.file_size > MAX_UPLOAD_BYTES):
+                continue
+            doc_id = str(uuid.uuid4())
+            file_path = os.path.join(upload_dir, f"{doc_id}_{filename}")
+            try:
+                # The declared size can be forged, the limit is enforced on the bytes written
+                with archive.open(info) as source:
+                    _, content_hash = write_stream(source, file_path)
+            except UploadTooLargeError:
+                continue
+            documents.append({
+                "doc_id": doc_id,
+                "filename": filename,
+                "file_path": file_path,
+                "content_hash": content_hash
+            })
+    return documents